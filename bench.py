@@ -0,0 +1,367 @@
+"""性能基准：在合成数据包上测量抽取、筛选与回写各环节
+
+三种模式，各自测什么见对应函数的说明：
+    python bench.py [--files 5000] [--per-file 12]    逐项计时，见 run_timings
+    python bench.py --startup 10                      GUI 冷启动，见 startup_times
+    python bench.py --suite [--record]                发布前的回归检查，见 run_suite；生成参数见 --help
+"""
+import argparse, json, os, platform, random, statistics, subprocess, sys, tempfile, time, tracemalloc, zipfile
+from typing import Dict
+
+from datapack import (JSON_FIELDS, COMMAND_TYPES, ParseCache, extract_entries, index_entries,
+                      build_translated_zip, scan_mcfunction, extract_json_entries, parse_mcfunction,
+                      apply_json_translation, apply_mcfunction_translation, read_text)
+from search import SearchIndex, Query
+
+
+# -------------------- 合成数据包 --------------------
+def make_pack(path: str, files: int, per_file: int):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr("pack.mcmeta", json.dumps({"pack": {"pack_format": 48, "description": "bench"}}))
+        for i in range(files):
+            if i % 2:
+                lines = [f'tellraw @a {{"text":"line {i}-{j}"}}' for j in range(per_file)]
+                z.writestr(f"data/bench/function/f{i}.mcfunction", "\n".join(lines))
+            else:
+                obj = {"display": {"title": f"adv {i}", "description": f"desc {i}"},
+                       "pages": [{"text": f"page {i}-{j}"} for j in range(per_file - 2)]}
+                z.writestr(f"data/bench/advancement/a{i}.json", json.dumps(obj))
+
+
+def make_function(lines: int) -> str:
+    """混合常见命令的大函数文件：多数行没有可翻译文本"""
+    templates = [
+        'scoreboard players operation @s bench.a += @s bench.b',
+        'execute as @a[tag=bench] at @s if score @s bench.a matches 1.. run function bench:tick',
+        'tellraw @a [{"text":"line %d","color":"gold"},{"text":" click","clickEvent":{"action":"run_command","value":"/trigger t"}}]',
+        'execute as @a run title @s subtitle {"text":"sub %d","italic":false}',
+        'item replace entity @s weapon.mainhand with minecraft:diamond_sword[custom_name=\'{"text":"Blade %d"}\',lore=[\'"first"\']] 1',
+        'data modify storage bench:s v set value {a:1b,b:"x"}',
+    ]
+    return "\n".join(templates[i % len(templates)].replace("%d", str(i)) for i in range(lines))
+
+
+# -------------------- 可配置的合成数据包 --------------------
+COMMAND_MIX = {"tellraw": 4, "title": 2, "bossbar": 1, "item": 2, "other": 6}   # 函数文件各类行的权重
+WORDS = ("ancient", "blade", "of", "the", "north", "crystal", "guardian", "quest", "reward", "Élan", "§6gold§r",
+         'say "hi"', "back\\slash", "tower", "dragon", "village", "secret", "lost", "mine", "shadow")
+ZIP_TIME = (2024, 1, 1, 0, 0, 0)   # 固定时间戳，同样的参数生成逐字节相同的 zip
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """"tellraw=4,title=2" -> {"tellraw": 4, "title": 2}，未写的类型权重为 0"""
+    mix = dict.fromkeys(COMMAND_MIX, 0)
+    for part in filter(None, spec.split(",")):
+        name, _, weight = part.partition("=")
+        if name.strip() not in mix:
+            raise ValueError(f"unknown command kind: {name}")
+        mix[name.strip()] = int(weight)
+    return mix
+
+class PackGenerator:
+    """由 seed 决定全部内容的数据包生成器：命名空间、进度、战利品表、函数文件数与函数行的命令比例均可配置"""
+    def __init__(self, namespaces=4, advancements=800, loot_tables=400, functions=800, lines=40,
+                 mix: Dict[str, int] = None, seed=0):
+        self.namespaces = namespaces
+        self.advancements = advancements
+        self.loot_tables = loot_tables
+        self.functions = functions
+        self.lines = lines
+        self.mix = dict(mix or COMMAND_MIX)
+        self.seed = seed
+
+    def spec(self) -> dict:
+        return {"namespaces": self.namespaces, "advancements": self.advancements, "loot_tables": self.loot_tables,
+                "functions": self.functions, "lines": self.lines, "mix": self.mix, "seed": self.seed}
+
+    def text(self, rng: random.Random) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))) + f" {rng.randint(0, 999)}"
+
+    def component(self, rng: random.Random) -> str:
+        return json.dumps({"text": self.text(rng), "color": rng.choice(("gold", "gray", "aqua"))}, ensure_ascii=False)
+
+    def advancement(self, rng: random.Random) -> dict:
+        title = self.text(rng) if rng.random() < 0.3 else {"text": self.text(rng)}
+        return {"display": {"icon": {"id": "minecraft:stone"}, "title": title,
+                            "description": {"text": self.text(rng), "color": "gray"}, "frame": "task"},
+                "criteria": {"c": {"trigger": "minecraft:impossible"}}}
+
+    def loot_table(self, rng: random.Random) -> dict:
+        functions = [{"function": "minecraft:set_name", "name": {"text": self.text(rng)}},
+                     {"function": "minecraft:set_lore", "lore": [{"text": self.text(rng)} for _ in range(rng.randint(1, 3))]}]
+        return {"pools": [{"rolls": 1, "entries": [{"type": "minecraft:item", "name": "minecraft:diamond",
+                                                    "functions": functions}]}]}
+
+    def command(self, rng: random.Random, ns: str, kind: str) -> str:
+        if kind == "tellraw":
+            line = f"tellraw @a [{self.component(rng)},{{\"text\":{json.dumps(self.text(rng), ensure_ascii=False)}}}]"
+            return f"execute as @a[tag={ns}] run {line}" if rng.random() < 0.3 else line
+        if kind == "title":
+            return f"title @a {rng.choice(('title', 'subtitle', 'actionbar'))} {self.component(rng)}"
+        if kind == "bossbar":
+            bar = f"{ns}:b{rng.randint(0, 9)}"
+            if rng.random() < 0.5:
+                return f"bossbar add {bar} {self.component(rng)}"
+            return f"bossbar set {bar} name {self.component(rng)}"
+        if kind == "item":
+            name = json.dumps({"text": self.text(rng)}, ensure_ascii=False).replace("'", "\\'")
+            lore = json.dumps(self.text(rng), ensure_ascii=False).replace("'", "\\'")
+            return f"item replace entity @s weapon.mainhand with minecraft:diamond_sword[custom_name='{name}',lore=['{lore}']] 1"
+        return rng.choice((f"scoreboard players add @s {ns}.t 1",
+                           f"execute as @a[scores={{{ns}.t=20..}}] run function {ns}:tick",
+                           f"data modify storage {ns}:s v set value {{a:1b,b:\"x\"}}"))
+
+    def function(self, rng: random.Random, ns: str) -> str:
+        kinds = [k for k, w in self.mix.items() if w > 0] or ["other"]
+        weights = [self.mix.get(k, 1) for k in kinds]
+        return "\n".join(self.command(rng, ns, kind) for kind in rng.choices(kinds, weights, k=self.lines))
+
+    def write(self, path: str) -> int:
+        """写出 zip，返回成员数；每个成员用自己的随机序列，改动某一类的数量不影响其他成员的内容"""
+        members = [("pack.mcmeta", json.dumps({"pack": {"pack_format": 48, "description": "bench"}}))]
+        for n in range(self.namespaces):
+            ns = f"bench{n}"
+            share = lambda total: total // self.namespaces + (1 if n < total % self.namespaces else 0)
+            for i in range(share(self.advancements)):
+                rng = random.Random(f"{self.seed}/{ns}/a{i}")
+                members.append((f"data/{ns}/advancement/a{i}.json", json.dumps(self.advancement(rng), ensure_ascii=False)))
+            for i in range(share(self.loot_tables)):
+                rng = random.Random(f"{self.seed}/{ns}/l{i}")
+                members.append((f"data/{ns}/loot_table/l{i}.json", json.dumps(self.loot_table(rng), ensure_ascii=False)))
+            for i in range(share(self.functions)):
+                rng = random.Random(f"{self.seed}/{ns}/f{i}")
+                members.append((f"data/{ns}/function/f{i}.mcfunction", self.function(rng, ns)))
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+            for name, data in members:
+                info = zipfile.ZipInfo(name, ZIP_TIME)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                z.writestr(info, data)
+        return len(members)
+
+
+# -------------------- 计时 --------------------
+def legacy_member_scan(zin: zipfile.ZipFile, entries):
+    """旧实现中每个成员都执行一次 any(...) 的开销（不含读写）"""
+    entries = list(entries)
+    return sum(1 for info in zin.infolist() if any(e.file == info.filename for e in entries))
+
+
+def startup_times(runs: int) -> list:
+    """从启动 python main.py 到窗口显示、事件循环开始后退出的总耗时（含解释器启动与退出）
+
+    每次都新开进程，窗口显示后立即退出
+    """
+    env = dict(os.environ, MCDT_STARTUP_BENCH="1")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        subprocess.run([sys.executable, script], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t)
+    return times
+
+
+def run_timings(files: int, per_file: int):
+    """逐项打印耗时：串行 / 并行 / 缓存抽取、mcfunction 单遍扫描吞吐、筛选栏索引查询，
+    旧的逐条扫描与按文件索引两种回写方式，以及串行 / 并行 / 仅存储三种压缩方式
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "bench.zip")
+        make_pack(src, files, per_file)
+        jf, cf = set(JSON_FIELDS), set(COMMAND_TYPES)
+        t = time.perf_counter()
+        entries = extract_entries(src, jf, cf, workers=1)
+        print(f"serial parse      : {time.perf_counter() - t:8.3f}s")
+        t = time.perf_counter()
+        parallel = extract_entries(src, jf, cf)
+        print(f"parallel parse    : {time.perf_counter() - t:8.3f}s ({os.cpu_count()} cpus)")
+        assert [(e.file, e.path, e.text) for e in parallel] == [(e.file, e.path, e.text) for e in entries]
+        cache_dir = os.path.join(tmp, "cache")
+        extract_entries(src, jf, cf, cache=ParseCache(cache_dir, src, jf, cf))
+        t = time.perf_counter()
+        extract_entries(src, jf, cf, cache=ParseCache(cache_dir, src, jf, cf))
+        print(f"cached reparse    : {time.perf_counter() - t:8.3f}s")
+        for row in range(0, len(entries), 3):
+            entries[row].translated = entries[row].text + " (t)"
+        print(f"members={files + 1} entries={len(entries)}")
+
+        content = make_function(20 * files)
+        t = time.perf_counter()
+        found = sum(1 for _ in scan_mcfunction(content, cf))
+        dt = time.perf_counter() - t
+        print(f"mcfunction scan   : {dt:8.3f}s ({len(content) / dt / 1e6:.1f} MB/s, {found} texts)")
+
+        search = SearchIndex(entries)
+        t = time.perf_counter()
+        search.build()
+        search.finish()
+        print(f"search index      : {time.perf_counter() - t:8.3f}s")
+        rows = entries.select(jf, cf)
+        for spec, untranslated in (("l", False), ("line", False), ("page 1", False), ("path:display", False),
+                                   ("", True)):
+            t = time.perf_counter()
+            hits = len(search.filter(rows, Query(spec, untranslated)))
+            label = spec + (" untranslated" if untranslated else "")
+            print(f"search filter     : {(time.perf_counter() - t) * 1000:8.1f}ms ({hits} rows, {label.strip()!r})")
+
+        with zipfile.ZipFile(src) as zin:
+            t = time.perf_counter()
+            legacy_member_scan(zin, entries)
+            print(f"legacy any() scan : {time.perf_counter() - t:8.3f}s")
+
+            t = time.perf_counter()
+            index = index_entries(entries)
+            print(f"index_entries     : {time.perf_counter() - t:8.3f}s")
+
+            t = time.perf_counter()
+            build_translated_zip(zin, entries, os.path.join(tmp, "out.zip"), index, workers=1)
+            print(f"indexed save      : {time.perf_counter() - t:8.3f}s")
+
+            t = time.perf_counter()
+            build_translated_zip(zin, entries, os.path.join(tmp, "out.zip"), index)
+            print(f"parallel deflate  : {time.perf_counter() - t:8.3f}s ({os.cpu_count()} cpus)")
+
+            t = time.perf_counter()
+            build_translated_zip(zin, entries, os.path.join(tmp, "out.zip"), index, level=0)
+            print(f"stored save       : {time.perf_counter() - t:8.3f}s")
+
+
+# -------------------- 回归检查 --------------------
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+NOISE_FLOOR = {"s": 0.02, "mb": 0.5}   # 比基准多出不到这么多的不算回归，避免很短的计时被抖动误报
+
+def best_of(repeat: int, fn) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+def peak_mb(fn) -> float:
+    """tracemalloc 统计的 Python 分配峰值，单独跑一遍，不影响计时"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+def run_suite(gen: PackGenerator, repeat: int) -> dict:
+    """按 gen 生成确定的数据包，记录各环节耗时与峰值内存，供 compare 与 bench_baseline.json 比较
+
+    各环节取 repeat 次中最快的一次；抽取与回写都用单线程，结果不受核数影响。最后核对译文包能原样抽回译文
+    """
+    jf, cf = set(JSON_FIELDS), set(COMMAND_TYPES)
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "suite.zip")
+        out = os.path.join(tmp, "out.zip")
+        members = gen.write(src)
+        with zipfile.ZipFile(src) as z:
+            json_names = [n for n in z.namelist() if n.endswith(".json")]
+            fn_names = [n for n in z.namelist() if n.endswith(".mcfunction")]
+            metrics["extract_json_entries_s"] = best_of(repeat, lambda: [extract_json_entries(z, n, jf) for n in json_names])
+            metrics["parse_mcfunction_s"] = best_of(repeat, lambda: [parse_mcfunction(z, n, cf) for n in fn_names])
+            texts = {n: read_text(z, n) for n in json_names + fn_names}
+        metrics["extract_entries_s"] = best_of(repeat, lambda: extract_entries(src, jf, cf, workers=1))
+        metrics["extract_entries_peak_mb"] = peak_mb(lambda: extract_entries(src, jf, cf, workers=1))
+
+        store = extract_entries(src, jf, cf, workers=1)
+        for row in range(0, len(store), 2):
+            store.translations[row] = store.texts[row] + " (t)"
+        index = index_entries(store)
+        by_path = {name: {path: store[row] for path, row in rows.items()} for name, rows in index.items()}
+        objs = {n: json.loads(texts[n]) for n in json_names}
+        metrics["apply_json_translation_s"] = best_of(
+            repeat, lambda: [apply_json_translation(objs[n], by_path.get(n, {})) for n in json_names])
+        metrics["apply_mcfunction_translation_s"] = best_of(
+            repeat, lambda: [apply_mcfunction_translation(texts[n], by_path.get(n, {})) for n in fn_names])
+        with zipfile.ZipFile(src) as z:
+            metrics["build_translated_zip_s"] = best_of(repeat, lambda: build_translated_zip(z, store, out, index, workers=1))
+            metrics["build_translated_zip_peak_mb"] = peak_mb(lambda: build_translated_zip(z, store, out, index, workers=1))
+        check = extract_entries(out, jf, cf, workers=1)
+        if check.texts != [store.translations.get(r, t) for r, t in enumerate(store.texts)]:
+            raise AssertionError("translated pack does not extract back to the applied translations")
+    return {"spec": gen.spec(), "members": members, "entries": len(store),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "metrics": {k: round(v, 4) for k, v in metrics.items()}}
+
+def compare(result: dict, baseline: dict, tolerance: float) -> int:
+    """逐项与基准比较并打印，返回回归项数；调用方已确认两者的生成参数相同"""
+    if baseline.get("machine") != result["machine"]:
+        print(f"note: baseline recorded on {baseline.get('machine')}")
+    regressions = 0
+    print(f"{'metric':<34}{'baseline':>10}{'now':>10}{'change':>9}")
+    for name, now in result["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if base is None:
+            print(f"{name:<34}{'-':>10}{now:>10.3f}{'':>9}  new")
+            continue
+        floor = NOISE_FLOOR[name.rsplit("_", 1)[-1]]
+        bad = now > base * (1 + tolerance) and now - base > floor
+        regressions += bad
+        change = (now / base - 1) * 100 if base else 0.0
+        print(f"{name:<34}{base:>10.3f}{now:>10.3f}{change:>+8.1f}%  {'REGRESSION' if bad else 'ok'}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=5000)
+    ap.add_argument("--per-file", type=int, default=12)
+    ap.add_argument("--startup", type=int, metavar="RUNS", help="only measure GUI cold start, RUNS times")
+    suite = ap.add_argument_group("regression suite")
+    suite.add_argument("--suite", action="store_true",
+                       help="run the regression suite against the stored baseline; exits 1 on regressions, "
+                            "2 without a baseline recorded with the same pack parameters")
+    suite.add_argument("--namespaces", type=int, default=4)
+    suite.add_argument("--advancements", type=int, default=800)
+    suite.add_argument("--loot-tables", type=int, default=400)
+    suite.add_argument("--functions", type=int, default=800)
+    suite.add_argument("--lines", type=int, default=40, help="lines per function file")
+    suite.add_argument("--mix", default=",".join(f"{k}={w}" for k, w in COMMAND_MIX.items()),
+                       help="weights of function lines, e.g. tellraw=4,title=2,bossbar=1,item=2,other=6")
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--baseline", default=BASELINE)
+    suite.add_argument("--update-baseline", "--record", dest="update_baseline", action="store_true",
+                       help="store this run as the new baseline")
+    suite.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / growth, 0.25 = 25%%")
+    args = ap.parse_args()
+    if args.startup:
+        times = startup_times(args.startup)
+        print(f"startup           : {min(times):8.3f}s min, {statistics.median(times):.3f}s median ({len(times)} runs)")
+        return 0
+    if args.suite:
+        gen = PackGenerator(args.namespaces, args.advancements, args.loot_tables, args.functions, args.lines,
+                            parse_mix(args.mix), args.seed)
+        result = run_suite(gen, args.repeat)
+        print(f"members={result['members']} entries={result['entries']}")
+        if args.update_baseline:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            for name, value in result["metrics"].items():
+                print(f"{name:<34}{value:>10.3f}")
+            print(f"baseline written to {args.baseline}")
+            return 0
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            baseline = None
+        if baseline is None or baseline.get("spec") != result["spec"]:
+            # 没有可比的基准就什么也没检查，不能当作通过
+            for name, value in result["metrics"].items():
+                print(f"{name:<34}{value:>10.3f}")
+            reason = "no baseline" if baseline is None else "baseline recorded with different pack parameters"
+            print(f"{reason} at {args.baseline}; run with --record to store one")
+            return 2
+        regressions = compare(result, baseline, args.tolerance)
+        print(f"{regressions} regression(s)" if regressions else "no regressions")
+        return 1 if regressions else 0
+    run_timings(args.files, args.per_file)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
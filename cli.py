@@ -0,0 +1,143 @@
+"""无界面批量翻译入口：不导入 Qt，可在没有显示器的 Linux 上用进程池同时处理多个数据包
+
+用法: python cli.py pack1.zip pack2.zip -t translations.json [-t more.json] [-o out_dir] [-j 8] [-l 0] [--diag [out.json]]
+
+数据包也可以是解包后的目录，译文包默认写到同级的 <目录>_translated 目录，加 --zip 则写成 zip
+
+译文文件为 JSON，两种写法可以混用:
+  {"data/ns/advancement/a.json": {"display.title": "译文"}}   按 (文件, 路径) 精确匹配
+  {"Click here": "点击这里"}                                   按原文匹配
+也可以是界面「导出译文」得到、经外部翻译工具改过的 .csv / .xlf / .xliff，以及 {"成员名#路径": "译文"} 形式的 lang JSON
+"""
+import argparse, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from datapack import (JSON_FIELDS, COMMAND_TYPES, extract_entries, index_entries, iter_translated, open_source,
+                      default_output)
+from diag import DIAG
+from exchange import RE_LANG_KEY, read_records
+
+
+KeyedTranslations = Dict[Tuple[str, str], Tuple[Optional[str], str]]   # (文件, 路径) -> (导出时的原文或 None, 译文)
+
+def load_translations(paths) -> Tuple[KeyedTranslations, Dict[str, str]]:
+    """CSV / XLIFF 带着导出时的原文，应用时原文对不上的不写；JSON 里按键给出的译文没有原文，不核对，
+    但 lang JSON 中 mcfunction 的键（路径按行号记）无从核对，跳过并报告"""
+    by_key, by_text = {}, {}
+    for p in paths:
+        if os.path.splitext(p)[1].lower() in (".csv", ".xlf", ".xliff"):
+            for file, path, source, text in read_records(p):
+                if text:
+                    by_key[(file, path)] = (source, text)
+            continue
+        with open(p, encoding="utf-8") as f:
+            data = json.load(f)
+        unverified = 0
+        for k, v in data.items():
+            if isinstance(v, dict):
+                for path, text in v.items():
+                    by_key[(k, path)] = (None, text)
+            elif isinstance(v, str):
+                m = RE_LANG_KEY.fullmatch(k)
+                if m and m.group(1).endswith(".mcfunction"):
+                    unverified += 1
+                elif m:
+                    by_key[(m.group(1), m.group(2))] = (None, v)
+                else:
+                    by_text[k] = v
+        if unverified:
+            print(f"{p}: {unverified} mcfunction keys skipped, lang JSON has no source text to check them against")
+    return by_key, by_text
+
+
+def output_path(zpath: str, out_dir: str = None, as_zip: bool = False) -> str:
+    out = default_output(zpath)
+    if as_zip and not out.endswith(".zip"):
+        out += ".zip"
+    return os.path.join(out_dir, os.path.basename(out)) if out_dir else out
+
+
+def translate_pack(zpath: str, out: str, by_key: KeyedTranslations, by_text: Dict[str, str],
+                   level: int = None, diag: bool = False) -> dict:
+    """在子进程中处理一个数据包，返回条目数、各阶段耗时、用到的键与原文已改动的键数；diag 时附带本包的诊断数据
+
+    按键的译文只在原文与导出时相同时写入（路径按行号记，前面插入一行后同一路径就是另一句原文），否则按原文匹配
+    """
+    DIAG.enabled = diag
+    DIAG.reset()
+    t0 = time.perf_counter()
+    store = extract_entries(zpath, set(JSON_FIELDS), set(COMMAND_TYPES), workers=1)
+    t1 = time.perf_counter()
+    hit, stale = [], 0
+    for e in store:
+        key = e.key()
+        keyed = by_key.get(key)
+        text = None
+        if keyed is not None:
+            hit.append(key)
+            source, text = keyed
+            if source is not None and source != e.text:
+                stale += 1
+                text = None
+        text = text or by_text.get(e.text)
+        if text:
+            e.translated = text
+    t2 = time.perf_counter()
+    with open_source(zpath) as src:
+        for _ in iter_translated(src, store, out, index_entries(store), level, workers=1):
+            pass
+    t3 = time.perf_counter()
+    return {"pack": zpath, "out": out, "entries": len(store), "translated": len(store.translations),
+            "hit": hit, "stale": stale, "parse": t1 - t0, "apply": t2 - t1, "save": t3 - t2, "diag": DIAG.raw() if diag else None}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="MC Datapack Translator (headless batch mode)")
+    ap.add_argument("packs", nargs="+", help="datapack .zip files or unpacked directories")
+    ap.add_argument("-t", "--translations", action="append", default=[], help="translation JSON file")
+    ap.add_argument("-o", "--out-dir", help="output directory (default: next to each pack)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    ap.add_argument("-l", "--level", type=int, choices=range(10), metavar="0-9",
+                    help="compression level for rewritten files, 0 = store (default: keep zlib default)")
+    ap.add_argument("--zip", action="store_true", help="write unpacked directory packs as .zip instead of a directory")
+    ap.add_argument("--diag", nargs="?", const="", metavar="OUT.json",
+                    help="print phase timings and counters to stderr, optionally also write them as JSON")
+    args = ap.parse_args(argv)
+
+    by_key, by_text = load_translations(args.translations)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    start = time.perf_counter()
+    failed = 0
+    hit = set()
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [pool.submit(translate_pack, p, output_path(p, args.out_dir, args.zip), by_key, by_text,
+                               args.level, args.diag is not None)
+                   for p in args.packs]
+        for pack, fut in zip(args.packs, futures):
+            try:
+                r = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"FAIL {pack}: {e}", file=sys.stderr)
+                continue
+            DIAG.merge(r["diag"])
+            hit.update(r["hit"])
+            stale = f", {r['stale']} stale keys skipped" if r["stale"] else ""
+            print(f"{r['pack']}: {r['translated']}/{r['entries']} translated{stale}, "
+                  f"parse {r['parse']:.3f}s, apply {r['apply']:.3f}s, save {r['save']:.3f}s -> {r['out']}")
+    print(f"{len(args.packs) - failed}/{len(args.packs)} packs in {time.perf_counter() - start:.3f}s")
+    missing = len(by_key.keys() - hit)
+    if missing:
+        print(f"{missing} translation keys matched no entry in any pack")
+    if args.diag is not None:
+        DIAG.enabled = True
+        print(DIAG.report(), file=sys.stderr)
+        if args.diag:
+            DIAG.export(args.diag)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1265 @@
+"""数据包文本抽取与回写（不依赖 Qt，可在子进程 / 命令行中使用）"""
+import json, re, itertools, heapq, zipfile, zlib, os, io, struct, copy, pickle, hashlib, pathlib, shutil, mmap, time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Tuple, Iterator
+
+from diag import DIAG
+
+# -------------------- 数据 --------------------
+Row = Tuple[str, str, str, str, int, int]   # (text, path, cmd, field, start, end)，抽取函数按成员返回的紧凑记录
+NO_SPAN = (0, 0)   # 无法定位原文字符串字面量时的占位
+
+class EntryStore:
+    """列式条目存储：file / path / cmd / field 以 id 形式存放在数组里，原文一列，译文按行号稀疏存放"""
+    TABLES = ("files", "paths", "cmds", "fields", "texts")   # 字符串表
+    COLUMNS = ("file_col", "path_col", "cmd_col", "field_col", "start_col", "end_col")   # 按行的数组列
+    def __init__(self):
+        self.files: List[str] = []
+        self.file_ids: Dict[str, int] = {}
+        self.paths: List[str] = []
+        self.path_ids: Dict[str, int] = {}
+        self.cmds: List[str] = [None]
+        self.cmd_ids: Dict[str, int] = {None: 0}
+        self.fields: List[str] = []
+        self.field_ids: Dict[str, int] = {}
+        self.file_col = array("I")
+        self.path_col = array("I")
+        self.cmd_col = array("H")
+        self.field_col = array("H")
+        self.start_col = array("I")   # 字符串字面量（含引号）在解码后成员文本中的字符区间
+        self.end_col = array("I")
+        self.texts: List[str] = []
+        self.translations: Dict[int, str] = {}
+    @staticmethod
+    def _intern(table: list, ids: dict, value) -> int:
+        i = ids.get(value)
+        if i is None:
+            i = ids[value] = len(table)
+            table.append(value)
+        return i
+    def add(self, file: str, rows: List[Row]) -> int:
+        """追加同一文件的若干条记录，返回新增条数"""
+        if not rows:
+            return 0
+        intern = self._intern
+        paths, path_ids, cmds, cmd_ids = self.paths, self.path_ids, self.cmds, self.cmd_ids
+        fields, field_ids = self.fields, self.field_ids
+        for text, path, cmd, field, start, end in rows:
+            self.texts.append(text)
+            self.path_col.append(intern(paths, path_ids, path))
+            self.cmd_col.append(intern(cmds, cmd_ids, cmd))
+            self.field_col.append(intern(fields, field_ids, field))
+            self.start_col.append(start)
+            self.end_col.append(end)
+        self.file_col.extend([intern(self.files, self.file_ids, file)] * len(rows))
+        return len(rows)
+    @classmethod
+    def from_columns(cls, tables: Dict[str, list], columns: Dict[str, array]) -> "EntryStore":
+        """由 TABLES / COLUMNS 各列直接还原（读取项目文件用），不必逐行 add"""
+        store = cls()
+        for name in cls.TABLES:
+            setattr(store, name, list(tables[name]))
+        for name in cls.COLUMNS:
+            col = getattr(store, name)
+            col.extend(columns[name])
+        store.file_ids = {v: i for i, v in enumerate(store.files)}
+        store.path_ids = {v: i for i, v in enumerate(store.paths)}
+        store.cmd_ids = {v: i for i, v in enumerate(store.cmds)}
+        store.field_ids = {v: i for i, v in enumerate(store.fields)}
+        if any(len(getattr(store, name)) != len(store.texts) for name in cls.COLUMNS):
+            raise ValueError("column length mismatch")
+        return store
+    def __len__(self):
+        return len(self.texts)
+    def __getitem__(self, row: int) -> "Entry":
+        if row < 0:
+            row += len(self.texts)
+        if not 0 <= row < len(self.texts):
+            raise IndexError(row)
+        return Entry(self, row)
+    def __iter__(self) -> Iterator["Entry"]:
+        for row in range(len(self.texts)):
+            yield Entry(self, row)
+    def snapshot(self) -> "EntryStore":
+        """共用各列、复制一份译文的浅拷贝，供后台保存时界面继续编辑"""
+        snap = copy.copy(self)
+        snap.translations = dict(self.translations)
+        return snap
+    def group_by_text(self, rows) -> List[array]:
+        """把给定行按原文分组，组的顺序即原文第一次出现的顺序"""
+        groups: Dict[str, array] = {}
+        texts = self.texts
+        for row in rows:
+            g = groups.get(texts[row])
+            if g is None:
+                g = groups[texts[row]] = array("I")
+            g.append(row)
+        return list(groups.values())
+    def select(self, json_fields: set, cmd_types: set, start: int = 0) -> array:
+        """按设置筛选行号：JSON 条目看抽取字段，mcfunction 条目看命令类型（命名空间在解析时就已过滤）"""
+        field_ok = [f in json_fields for f in self.fields]
+        cmd_ok = [c in cmd_types for c in self.cmds]
+        cols = zip(self.cmd_col[start:], self.field_col[start:])
+        return array("I", (row for row, (cid, sid) in enumerate(cols, start)
+                           if (cmd_ok[cid] if cid else field_ok[sid])))
+
+class Entry:
+    """EntryStore 中一行的视图，读写都直接落到存储的列上"""
+    __slots__ = ("store", "row")
+    def __init__(self, store: EntryStore, row: int):
+        self.store = store
+        self.row = row
+    @property
+    def file(self) -> str:
+        return self.store.files[self.store.file_col[self.row]]
+    @property
+    def text(self) -> str:
+        return self.store.texts[self.row]
+    @property
+    def path(self) -> str:
+        return self.store.paths[self.store.path_col[self.row]]
+    @property
+    def cmd(self) -> str:
+        return self.store.cmds[self.store.cmd_col[self.row]]
+    @property
+    def field(self) -> str:
+        return self.store.fields[self.store.field_col[self.row]]
+    @property
+    def span(self) -> Tuple[int, int]:
+        return self.store.start_col[self.row], self.store.end_col[self.row]
+    @property
+    def translated(self) -> str:
+        return self.store.translations.get(self.row, "")
+    @translated.setter
+    def translated(self, value: str):
+        if value:
+            self.store.translations[self.row] = value
+        else:
+            self.store.translations.pop(self.row, None)
+    def key(self):
+        return (self.file, self.path)
+
+JSON_FIELDS = ["title", "description", "displayName", "text", "subtitle", "name"]
+COMMAND_FIELDS = {
+    "tellraw": ["text"],
+    "title": ["title", "subtitle", "actionbar"],
+    "bossbar": ["name"],
+    "team": ["displayName", "prefix", "suffix"],
+    "scoreboard": ["objective.displayName"],
+    "item": ["Name", "Lore[]"],
+    "execute": ["run.title", "run.tellraw", "run.bossbar", "run.team", "run.scoreboard", "run.item"],
+}
+COMMAND_TYPES = list(COMMAND_FIELDS.keys())
+
+# -------------------- 数据包来源 --------------------
+class DirectorySource:
+    """把解包后的数据包目录当作只读的 ZipFile 使用，提供抽取与回写用到的 infolist / getinfo / read
+
+    成员的 CRC 字段存的是 mtime_ns 的低 32 位而不是真正的校验和，只给解析缓存判断文件是否改动，
+    这样比对缓存时不必先读一遍所有文件；以 "." 开头的文件和目录（.git 等）不算成员
+    """
+    MMAP_MIN_SIZE = 1 << 16   # 不小于此大小的文件用 mmap 读取
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.filename = self.root
+        self._infos: List[zipfile.ZipInfo] = None
+        self._by_name: Dict[str, zipfile.ZipInfo] = None
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+    def close(self):
+        pass
+    def path(self, name) -> str:
+        if isinstance(name, zipfile.ZipInfo):
+            name = name.filename
+        return os.path.join(self.root, *name.split("/"))
+    def infolist(self) -> List[zipfile.ZipInfo]:
+        if self._infos is None:
+            infos = []
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+                for fn in sorted(filenames):
+                    if fn.startswith("."):
+                        continue
+                    full = os.path.join(dirpath, fn)
+                    st = os.stat(full)
+                    info = zipfile.ZipInfo(os.path.relpath(full, self.root).replace(os.sep, "/"),
+                                           max(time.localtime(st.st_mtime)[:6], (1980, 1, 1, 0, 0, 0)))
+                    info.file_size = st.st_size
+                    info.CRC = st.st_mtime_ns & 0xFFFFFFFF
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    infos.append(info)
+            self._infos = infos
+            self._by_name = {i.filename: i for i in infos}
+        return self._infos
+    def namelist(self) -> List[str]:
+        return [i.filename for i in self.infolist()]
+    def getinfo(self, name: str) -> zipfile.ZipInfo:
+        self.infolist()
+        try:
+            return self._by_name[name]
+        except KeyError:
+            raise KeyError(f"There is no item named {name!r} in the directory") from None
+    def read(self, name) -> bytes:
+        with open(self.path(name), "rb") as f:
+            return f.read()
+    def view(self, name):
+        """成员内容的只读缓冲区：大文件返回 mmap（引用释放时自动解除映射），小文件直接读成 bytes"""
+        with open(self.path(name), "rb") as f:
+            if os.fstat(f.fileno()).st_size < self.MMAP_MIN_SIZE:
+                return f.read()
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def open_source(path: str):
+    """目录返回 DirectorySource，其余按 zip 打开"""
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    return zipfile.ZipFile(path, "r")
+
+def read_text(z, name, errors: str = "strict") -> str:
+    """按 UTF-8 读出成员文本；目录来源的大文件直接从 mmap 解码，不先复制成 bytes"""
+    with DIAG.phase("member.inflate"):
+        data = z.view(name) if isinstance(z, DirectorySource) else z.read(name)
+    DIAG.count("bytes.inflated", len(data))
+    with DIAG.phase("member.decode"):
+        return str(data, "utf-8", errors)
+
+def default_output(path: str) -> str:
+    """默认输出位置：pack.zip -> pack_translated.zip，目录 pack -> 同级目录 pack_translated"""
+    if os.path.isdir(path):
+        return os.path.normpath(path) + "_translated"
+    return os.path.splitext(path)[0] + "_translated.zip"
+
+# -------------------- JSON 抽取 --------------------
+RE_JSON_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+
+def string_spans(text: str, count: int, base: int = 0) -> List[Tuple[int, int]]:
+    """列出 text 中全部 JSON 字符串字面量的区间
+
+    抽取时按文档顺序数过每个键和字符串值，第 n 个字符串就对应第 n 个字面量；
+    数量对不上（例如有重复键）时返回 None，这个文件回写时退回重新解析
+    """
+    spans = [(m.start() + base, m.end() + base) for m in RE_JSON_STRING.finditer(text)]
+    return spans if len(spans) == count else None
+
+def with_spans(found: list, spans: List[Tuple[int, int]], cmd: str = None) -> List[Row]:
+    """found: [(text, path, field, 序号)] -> 带区间的 Row"""
+    if spans is None:
+        return [(t, p, cmd, f) + NO_SPAN for t, p, f, _ in found]
+    return [(t, p, cmd, f) + spans[n] for t, p, f, n in found]
+
+def extract_json_entries(z: zipfile.ZipFile, name: str, wanted: set) -> List[Row]:
+    found = []
+    seen = 0
+    def walk(node, path=""):
+        nonlocal seen
+        if isinstance(node, str):
+            seen += 1
+        elif isinstance(node, dict):
+            for k, v in node.items():
+                seen += 1
+                if k in wanted:
+                    if isinstance(v, str):
+                        found.append((v, f"{path}.{k}" if path else k, k, seen))
+                        seen += 1
+                    elif isinstance(v, list) and all(isinstance(i, str) for i in v):
+                        for idx, s in enumerate(v):
+                            found.append((s, f"{path}.{k}[{idx}]" if path else f"{k}[{idx}]", k, seen))
+                            seen += 1
+                    else:
+                        walk(v, f"{path}.{k}" if path else k)
+                else:
+                    walk(v, f"{path}.{k}" if path else k)
+        elif isinstance(node, list):
+            for idx, item in enumerate(node):
+                walk(item, f"{path}[{idx}]" if path else f"[{idx}]")
+    text = ""
+    try:
+        text = read_text(z, name)
+        with DIAG.phase("json.decode"):
+            obj = json.loads(text)
+        with DIAG.phase("json.walk"):
+            walk(obj)
+    except Exception as e:
+        print("JSON fail:", name, e)
+    with DIAG.phase("json.spans"):
+        return with_spans(found, string_spans(text, seen) if found else None)
+
+# -------------------- mcfunction 抽取 --------------------
+# 整个文件只扫一遍：先用一个多行正则跳到相关命令所在的行首，再在行内按参数定位文本组件，
+# 参数切分和组件解析都认得引号、转义与括号，不为每行创建子串；组件可以是 JSON，也可以是 SNBT
+# 以换行开头的字面前缀让正则引擎直接跳到行首，比 ^ 配合 re.M 逐字符尝试快得多；第一行单独匹配。
+# execute 行不逐行检查，而是直接找 "run 相关命令"，再回头确认所在行以 execute 开头
+# 最常见的简单 tellraw / title 行（见 FAST_LINE）整行由一个正则认出，直接从匹配区间产出条目，不经参数切分、JSON 解码和 _Walk
+TEXT_COMMANDS = (r"(tellraw(?=[ \t])|title(?=[ \t])|item(?=[ \t])|bossbar(?=[ \t]+(?:add|set)[ \t])"
+                 r"|team(?=[ \t]+(?:add|modify)[ \t])|scoreboard(?=[ \t]+objectives[ \t]+(?:add|modify)[ \t]))")
+RE_FIRST_COMMAND = re.compile(r"[ \t]*\$?" + TEXT_COMMANDS)
+RE_COMMAND = re.compile(r"\n[ \t]*\$?" + TEXT_COMMANDS)
+SIMPLE_ARG = (r"(?=[^ \t\r\n\"'{}\]])[^ \t\r\n\"'{}\[\]]*(?:\[[^\[\]\"'{}\n]*\][^ \t\r\n\"'{}\[\]]*)*")   # 不含引号、花括号，方括号不嵌套的参数
+PLAIN_STRING = r'"[^"\\\x00-\x1f]*"'   # 没有转义和控制字符的 JSON 字符串，去掉引号就是原文
+JSON_SCALAR = PLAIN_STRING + r"|true|false|null|-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?"
+OTHER_MEMBER = r'"(?!(?:text|title|subtitle|actionbar|Name)")[^"\\\x00-\x1f]*"[ \t]*:[ \t]*(?:' + JSON_SCALAR + ")"
+def _flat_object(key: str, lit: str) -> str:
+    """只有标量成员、恰好一个 TEXT_KEYS 键的 JSON 对象；key / lit 为该键与其字符串值的分组"""
+    return (r"\{[ \t]*(?:" + OTHER_MEMBER + r"[ \t]*,[ \t]*)*\"" + key + r"\"[ \t]*:[ \t]*" + lit
+            + r"(?:[ \t]*,[ \t]*" + OTHER_MEMBER + r")*[ \t]*\}")
+FLAT_ELEMENT = "(?:" + PLAIN_STRING + "|" + _flat_object("(?:text|title|subtitle|actionbar|Name)", PLAIN_STRING) + ")"
+FAST_LINE = (r"[ \t]*\$?(?:execute[ \t]+(?:(?!run[ \t])" + SIMPLE_ARG + r"[ \t]+)+run[ \t]+)?"
+             r"(?:tellraw[ \t]+" + SIMPLE_ARG + r"|title[ \t]+" + SIMPLE_ARG + r"[ \t]+(?P<kind>title|subtitle|actionbar))[ \t]+"
+             r"(?:(?P<str>" + PLAIN_STRING + r")|(?P<obj>" + _flat_object("(?P<key>text|title|subtitle|actionbar|Name)",
+                                                                       "(?P<lit>" + PLAIN_STRING + ")") + ")"
+             r"|(?P<arr>\[[ \t]*" + FLAT_ELEMENT + r"(?:[ \t]*,[ \t]*" + FLAT_ELEMENT + r")*[ \t]*\]))[ \t\r]*(?![^\n])")
+RE_FAST_LINE = re.compile(FAST_LINE)
+RE_ELEMENT = re.compile("(" + PLAIN_STRING + ")|" + _flat_object("(text|title|subtitle|actionbar|Name)", "(" + PLAIN_STRING + ")"))
+RE_JSON_KEY = re.compile(r'"([^"\\\x00-\x1f]*)"[ \t]*:')
+RE_RUN_COMMAND = re.compile(r"[ \t]run[ \t]+" + TEXT_COMMANDS)
+RE_EXECUTE = re.compile(r"[ \t]*\$?execute[ \t]")
+RE_SPACE = re.compile(r"[ \t\r]*")
+RE_ARG_RUN = re.compile(r"[^ \t\r\n\"'{}\[\]]+")   # 参数中不含空白、引号、括号的一段
+RE_QUOTED = {'"': re.compile(r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"'), "'": re.compile(r"'[^'\\\n]*(?:\\.[^'\\\n]*)*'")}
+RE_NBT_KEY = re.compile(r"[A-Za-z0-9_.+\-]+")
+RE_COMPONENT_KEY = re.compile(r"!?[a-z0-9_.\-]+(?::[a-z0-9_.\-/]+)?")
+RE_ARRAY_PREFIX = re.compile(r"[BIL];")
+RE_SCALAR = re.compile(r"[^ \t\r\n,\]}]+")
+RE_SNBT_ESCAPE = re.compile(r"\\(.)")
+JSON_DECODER = json.JSONDecoder()
+
+TEXT_KEYS = {"text", "title", "subtitle", "actionbar", "Name"}   # 组件对象里取出的文本键
+ITEM_TEXT_KEYS = {"Name", "Lore", "custom_name", "item_name", "lore"}   # 物品 NBT / 组件里存放文本组件的键
+ITEM_MODIFIER_KEYS = {"set_name": "name", "set_lore": "lore"}   # 内联物品修饰器里存放文本组件的键
+
+def decode_literal(lit: str) -> str:
+    """解码 JSON / SNBT 字符串字面量，单双引号均可"""
+    if lit[0] == '"':
+        try:
+            return json.loads(lit)
+        except ValueError:
+            pass
+    return RE_SNBT_ESCAPE.sub(r"\1", lit[1:-1])
+
+def encode_literal(value: str, quote: str = '"') -> str:
+    """按原字面量的引号重新编码"""
+    if quote == "'":
+        return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    return json.dumps(value, ensure_ascii=False)
+
+def _parse_value(s: str, i: int, stop: int, spans: list):
+    """解析 s[i:stop] 开头的一个 JSON / SNBT 值，返回 (值, 结束位置)
+
+    对象为 dict、列表为 list、字符串为 str，数字等标量为 None；
+    每个键和字符串按文档顺序把区间追加到 spans（与 json 解析结果的计数方式一致）；语法不对时抛 ValueError
+    """
+    i = RE_SPACE.match(s, i, stop).end()
+    if i >= stop:
+        raise ValueError("unexpected end")
+    c = s[i]
+    if c == "{":
+        return _parse_entries(s, i + 1, stop, "}", RE_NBT_KEY, ":", spans)
+    if c == "[":
+        j = RE_SPACE.match(s, i + 1, stop).end()
+        m = RE_COMPONENT_KEY.match(s, j, stop)
+        if m and (m.group().startswith("!") or s.startswith("=", RE_SPACE.match(s, m.end(), stop).end())):
+            # 物品组件列表 [minecraft:custom_name='...', !minecraft:food]
+            return _parse_entries(s, i + 1, stop, "]", RE_COMPONENT_KEY, "=", spans)
+        m = RE_ARRAY_PREFIX.match(s, j, stop)
+        return _parse_list(s, m.end() if m else j, stop, spans)
+    if c in RE_QUOTED:
+        m = RE_QUOTED[c].match(s, i, stop)
+        if not m:
+            raise ValueError("unterminated string")
+        spans.append(m.span())
+        return decode_literal(m.group()), m.end()
+    m = RE_SCALAR.match(s, i, stop)
+    if not m:
+        raise ValueError(f"unexpected {c!r}")
+    return None, m.end()
+
+def _parse_entries(s: str, i: int, stop: int, close: str, key_re, sep: str, spans: list):
+    node = {}
+    i = RE_SPACE.match(s, i, stop).end()
+    if s.startswith(close, i):
+        return node, i + 1
+    while True:
+        i = RE_SPACE.match(s, i, stop).end()
+        if i < stop and s[i] in RE_QUOTED:
+            key, i = _parse_value(s, i, stop, spans)
+        else:
+            m = key_re.match(s, i, stop)
+            if not m:
+                raise ValueError("bad key")
+            spans.append(m.span())
+            key, i = m.group(), m.end()
+        if key in node:
+            raise ValueError(f"duplicate key {key!r}")
+        i = RE_SPACE.match(s, i, stop).end()
+        if key.startswith("!"):
+            node[key] = None
+        elif s.startswith(sep, i):
+            node[key], i = _parse_value(s, i + 1, stop, spans)
+            i = RE_SPACE.match(s, i, stop).end()
+        else:
+            raise ValueError(f"expected {sep!r}")
+        if s.startswith(",", i):
+            i += 1
+        elif s.startswith(close, i):
+            return node, i + 1
+        else:
+            raise ValueError(f"expected {close!r}")
+
+def _parse_list(s: str, i: int, stop: int, spans: list):
+    node = []
+    i = RE_SPACE.match(s, i, stop).end()
+    if s.startswith("]", i):
+        return node, i + 1
+    while True:
+        value, i = _parse_value(s, i, stop, spans)
+        node.append(value)
+        i = RE_SPACE.match(s, i, stop).end()
+        if s.startswith(",", i):
+            i += 1
+        elif s.startswith("]", i):
+            return node, i + 1
+        else:
+            raise ValueError("expected ']'")
+
+def _parse_component(s: str, i: int, stop: int, strict: bool = False):
+    """解析一个文本组件，返回 (值, 全部字符串字面量的区间)
+
+    先按 JSON 整段解析（C 实现，快），不是合法 JSON（SNBT、单引号）时再逐词解析；
+    strict 时直接逐词解析，用于 JSON 里有重复键、字面量与解析结果对不上的情况
+    """
+    if not strict and s[i] in '{["':
+        try:
+            # 只解码本行：出错时 JSONDecodeError 会从头数换行算行号，整个文件传进去会变成平方复杂度
+            obj, end = JSON_DECODER.raw_decode(s[i:stop])
+        except ValueError:
+            pass
+        else:
+            return obj, [m.span() for m in RE_JSON_STRING.finditer(s, i, i + end)]
+    spans = []
+    return _parse_value(s, i, stop, spans)[0], spans
+
+def _arg_end(s: str, i: int, stop: int) -> int:
+    """从 i 开始的一个命令参数的结束位置：引号和括号里的空白不算分隔"""
+    depth = 0
+    while i < stop:
+        c = s[i]
+        if c in " \t\r":
+            if not depth:
+                return i
+            i += 1
+        elif c in RE_QUOTED:
+            m = RE_QUOTED[c].match(s, i, stop)
+            if not m:
+                return stop
+            i = m.end()
+        elif c in "{[":
+            depth += 1
+            i += 1
+        elif c in "}]":
+            depth -= 1
+            i += 1
+        else:
+            i = RE_ARG_RUN.match(s, i, stop).end()
+    return stop
+
+def _split_args(s: str, i: int, stop: int, count: int) -> Tuple[List[Tuple[int, int]], int]:
+    """切出前 count 个参数的区间，并返回其后下一个参数的起点（没有时为 None）"""
+    spans = []
+    while True:
+        i = RE_SPACE.match(s, i, stop).end()
+        if i >= stop:
+            return spans, None
+        if len(spans) == count:
+            return spans, i
+        j = _arg_end(s, i, stop)
+        spans.append((i, j))
+        i = j
+
+def _is_word(s: str, span: Tuple[int, int], word: str) -> bool:
+    return span[1] - span[0] == len(word) and s.startswith(word, span[0])
+
+def _execute_target(s: str, i: int, stop: int):
+    """跳过 execute 的子命令直到 run，返回 (被执行的命令, 其参数起点)；嵌套的 execute ... run execute 一并展开"""
+    while True:
+        i = RE_SPACE.match(s, i, stop).end()
+        if i >= stop:
+            return None, stop
+        j = _arg_end(s, i, stop)
+        if j - i == 3 and s.startswith("run", i):
+            k = RE_SPACE.match(s, j, stop).end()
+            m = RE_ARG_RUN.match(s, k, stop)
+            if not m:
+                return None, stop
+            if m.group() != "execute":
+                return m.group(), m.end()
+            j = m.end()
+        i = j
+
+def _component_args(s: str, name: str, i: int, stop: int) -> List[Tuple[int, str]]:
+    """按命令语法找出文本组件参数，返回 [(参数起点, 字段名)]；组件参数本身不必先切出结尾"""
+    if name == "tellraw":
+        a, rest = _split_args(s, i, stop, 1)
+        return [(rest, "text")] if rest else []
+    if name == "title":
+        a, rest = _split_args(s, i, stop, 2)
+        if rest and any(_is_word(s, a[1], f) for f in ("title", "subtitle", "actionbar")):
+            return [(rest, s[a[1][0]:a[1][1]])]
+        return []
+    if name == "bossbar":
+        a, rest = _split_args(s, i, stop, 2)
+        if rest and _is_word(s, a[0], "add"):
+            return [(rest, "name")]
+        a, rest = _split_args(s, i, stop, 3)
+        if rest and _is_word(s, a[0], "set") and _is_word(s, a[2], "name"):
+            return [(rest, "name")]
+        return []
+    if name == "team":
+        a, rest = _split_args(s, i, stop, 2)
+        if rest and _is_word(s, a[0], "add"):
+            return [(rest, "displayName")]
+        a, rest = _split_args(s, i, stop, 3)
+        if rest and _is_word(s, a[0], "modify") and \
+                any(_is_word(s, a[2], f) for f in ("displayName", "prefix", "suffix")):
+            return [(rest, s[a[2][0]:a[2][1]])]
+        return []
+    if name == "scoreboard":
+        a, rest = _split_args(s, i, stop, 4)
+        if rest and _is_word(s, a[0], "objectives"):
+            if _is_word(s, a[1], "add") or (_is_word(s, a[1], "modify") and _is_word(s, a[3], "displayname")):
+                return [(rest, "displayName")]
+        return []
+    if name == "item":
+        # 物品堆叠 id[组件] / id{NBT}，或内联的物品修饰器 JSON；目标选择器里的 NBT 不算
+        found = []
+        for a, b in _split_args(s, i, stop, 16)[0]:
+            if s[a] == "@":
+                continue
+            for j in range(a, b):
+                if s[j] in "{[":
+                    found.append((j, "item"))
+                    break
+        return found
+    return []
+
+class _Walk:
+    """在解析出的组件里找可翻译文本
+
+    seen 按文档顺序数过每个键和字符串，第 n 个就是 spans[n]；box 不为 None 时文本位于
+    全文 box 区间这个字符串里写着的 JSON 中（旧版物品 NBT 的 Name / Lore），spans 相对于其解码后的内容
+    """
+    __slots__ = ("spans", "seen", "out", "cmd", "box")
+    def __init__(self, spans: list, out: list, cmd: str, box: Tuple[int, int] = None):
+        self.spans = spans
+        self.seen = 0
+        self.out = out
+        self.cmd = cmd
+        self.box = box
+    def emit(self, text: str, path: str, field: str):
+        self.out.append((text, path, self.cmd, field) + self.spans[self.seen] + (self.box,))
+    def component(self, node, path: str, field: str, component: bool = True):
+        """组件位置上的字符串、对象里 TEXT_KEYS 的值；extra 里的元素也是组件"""
+        if isinstance(node, str):
+            if component and node.strip():
+                self.emit(node, path, field)
+            self.seen += 1
+        elif isinstance(node, dict):
+            for k, v in node.items():
+                self.seen += 1
+                p = f"{path}.{k}"
+                if isinstance(v, str):
+                    if k in TEXT_KEYS and v.strip():
+                        self.emit(v, p, k)
+                    self.seen += 1
+                elif isinstance(v, list):
+                    for idx, item in enumerate(v):
+                        self.component(item, f"{p}[{idx}]", field, k == "extra")
+                elif isinstance(v, dict):
+                    self.component(v, p, k, False)
+        elif isinstance(node, list):
+            for idx, item in enumerate(node):
+                self.component(item, f"{path}[{idx}]", field, component)
+    def item(self, node, path: str):
+        """物品 NBT / 组件 / 内联修饰器，只看存放文本组件的键"""
+        if isinstance(node, dict):
+            fn = node.get("function")
+            fn = fn.rsplit(":", 1)[-1] if isinstance(fn, str) else None
+            for k, v in node.items():
+                self.seen += 1
+                key = k.rsplit(":", 1)[-1]
+                p = f"{path}.{k}"
+                if key in ITEM_TEXT_KEYS or key == ITEM_MODIFIER_KEYS.get(fn):
+                    for idx, item in enumerate(v) if isinstance(v, list) else ((None, v),):
+                        self.item_text(item, p if idx is None else f"{p}[{idx}]", key)
+                else:
+                    self.item(v, p)
+        elif isinstance(node, list):
+            for idx, item in enumerate(node):
+                self.item(item, f"{path}[{idx}]")
+        elif isinstance(node, str):
+            self.seen += 1
+    def item_text(self, node, path: str, field: str):
+        """旧版 NBT 与 1.20.5 起的组件把 JSON 写在字符串里，1.21.5 起直接是 SNBT"""
+        if not (isinstance(node, str) and node[:1] in ("{", "[", '"')):
+            self.component(node, path, field)
+            return
+        box = self.spans[self.seen]
+        self.seen += 1
+        mark = len(self.out)
+        try:
+            inner = _Walk([], self.out, self.cmd, box)
+            node, inner.spans = _parse_component(node, 0, len(node))
+            inner.component(node, path, field)
+            if inner.seen != len(inner.spans):
+                del self.out[mark:]
+        except (ValueError, RecursionError):
+            del self.out[mark:]
+
+def _command_lines(content: str) -> Iterator[Tuple[int, str, int, str]]:
+    """按行序产出 (行首, 顶层命令, 被执行命令的参数起点, 被执行命令)；不是 execute 时两个命令相同"""
+    first = RE_FIRST_COMMAND.match(content)
+    direct = ((m.start() + 1, m.group(1), m.end(), m.group(1)) for m in RE_COMMAND.finditer(content))
+    if first:
+        direct = itertools.chain([(0, first.group(1), first.end(), first.group(1))], direct)
+    def executed():
+        last = -1
+        for m in RE_RUN_COMMAND.finditer(content):
+            start = content.rfind("\n", 0, m.start()) + 1
+            if start == last:
+                continue
+            last = start
+            e = RE_EXECUTE.match(content, start, m.start())
+            if not e:
+                continue
+            head = content[e.end():m.start()]
+            if "\"" in head or "'" in head or head.count("[") != head.count("]") or head.count("{") != head.count("}"):
+                # run 前面有引号或括号没配平，可能落在字符串 / NBT 里，按参数逐个确认
+                stop = content.find("\n", m.end())
+                name, i = _execute_target(content, e.end(), len(content) if stop == -1 else stop)
+                if name in COMMAND_FIELDS:
+                    yield start, "execute", i, name
+            else:
+                yield start, "execute", m.end(), m.group(1)
+    return heapq.merge(direct, executed())
+
+def _scan_command(content: str, cmd: str, name: str, i: int, path: str, out: list):
+    """逐参数解析一行命令的文本组件，条目追加到 out"""
+    stop = content.find("\n", i)
+    if stop == -1:
+        stop = len(content)
+    for start, field in _component_args(content, name, i, stop):
+        for strict in (False, True):
+            mark = len(out)
+            try:
+                node, spans = _parse_component(content, start, stop, strict)
+                walk = _Walk(spans, out, cmd)
+                if field == "item":
+                    walk.item(node, path)
+                else:
+                    walk.component(node, path, field)
+            except (ValueError, RecursionError):   # 不是文本组件，或嵌套深到解析不了：跳过这个参数
+                del out[mark:]
+                break
+            if walk.seen == len(spans):
+                break
+            del out[mark:]
+
+def _distinct_keys(content: str, start: int, end: int) -> bool:
+    """FAST_LINE 认出的对象没有重复的键（重复键的组件整个不取，交给逐参数解析处理）"""
+    if content.count(":", start, end) < 3:   # 重复的只可能是两个以上的非文本键
+        return True
+    keys = RE_JSON_KEY.findall(content, start, end)
+    return len(keys) == len(set(keys))
+
+def _fast_rows(content: str, m, cmd: str, path: str, out: list) -> bool:
+    """FAST_LINE 匹配的行直接由分组区间产出条目，与逐参数解析的结果相同；遇到重复键返回 False"""
+    field = m.group("kind") or "text"
+    a, b = m.span("str")
+    if a >= 0:
+        if content[a + 1:b - 1].strip():
+            out.append((content[a + 1:b - 1], path, cmd, field, a, b, None))
+        return True
+    a, b = m.span("obj")
+    if a >= 0:
+        if not _distinct_keys(content, a, b):
+            return False
+        key = m.group("key")
+        a, b = m.span("lit")
+        if content[a + 1:b - 1].strip():
+            out.append((content[a + 1:b - 1], f"{path}.{key}", cmd, key, a, b, None))
+        return True
+    a, b = m.span("arr")
+    for idx, e in enumerate(RE_ELEMENT.finditer(content, a, b)):
+        if e.start(1) >= 0:
+            a, b = e.span(1)
+            if content[a + 1:b - 1].strip():
+                out.append((content[a + 1:b - 1], f"{path}[{idx}]", cmd, field, a, b, None))
+            continue
+        if not _distinct_keys(content, e.start(), e.end()):
+            return False
+        a, b = e.span(3)
+        if content[a + 1:b - 1].strip():
+            key = e.group(2)
+            out.append((content[a + 1:b - 1], f"{path}[{idx}].{key}", cmd, key, a, b, None))
+    return True
+
+def scan_mcfunction(content: str, wanted) -> Iterator[tuple]:
+    """单遍扫描 mcfunction 全文，产出 (text, path, cmd, field, start, end, box)
+
+    box 为 None 时 [start, end) 是字符串字面量在全文中的区间，否则见 _Walk
+    """
+    out = []
+    lineno, last = 1, 0
+    for line_start, cmd, i, name in _command_lines(content):
+        if cmd not in wanted:
+            continue
+        lineno += content.count("\n", last, line_start)
+        last = line_start
+        path = f"line{lineno}"
+        m = RE_FAST_LINE.match(content, line_start) if name == "tellraw" or name == "title" else None
+        if m is None or not _fast_rows(content, m, cmd, path, out):
+            del out[:]
+            _scan_command(content, cmd, name, i, path, out)
+        yield from out
+        out.clear()
+
+def parse_mcfunction(z: zipfile.ZipFile, name: str, wanted: set) -> List[Row]:
+    try:
+        content = read_text(z, name)
+    except: return []
+    with DIAG.phase("mcfunction.scan"):
+        return [(text, path, cmd, field) + (NO_SPAN if box else (start, end))
+                for text, path, cmd, field, start, end, box in scan_mcfunction(content, wanted)]
+
+# -------------------- 回写 --------------------
+def index_entries(store: EntryStore) -> Dict[str, Dict[str, int]]:
+    """按文件建立 {file: {path: row}} 索引，解析完成后建一次，回写时复用"""
+    by_fid: Dict[int, Dict[str, int]] = {}
+    paths = store.paths
+    for row, (fid, pid) in enumerate(zip(store.file_col, store.path_col)):
+        rows = by_fid.get(fid)
+        if rows is None:
+            rows = by_fid[fid] = {}
+        rows[paths[pid]] = row
+    return {store.files[fid]: rows for fid, rows in by_fid.items()}
+
+RAW_COPY_CHUNK = 1 << 20
+COMPRESS_WINDOW_PER_WORKER = 4   # 每个压缩线程最多积压的待写成员数，限制内存占用
+
+# -------------------- zip 底层写入 --------------------
+# 格式常量按 ZIP 规范（APPNOTE 4.3.7 / 4.4.4 / 4.5.2）自己定义；搬运原始压缩字节、写入线程池预先压缩好的数据
+# 还要直接操作 ZipFile 对象的内部状态，这些名字在 CPython 3.10 - 3.13 上测试过。
+# 缺少任何一个时 RAW_ZIP 为 False，改由 ZipFile.open(..., "w") / writestr 解压后重新压缩写入，慢一些但结果相同
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")   # 本地文件头，末两项为文件名长度、扩展字段长度
+DATA_DESCRIPTOR_FLAG = 0x08
+ZIP64_EXTRA_ID = 0x0001
+ZIPFILE_INTERNALS = ("_lock", "_didModify", "start_dir", "fp", "filelist", "NameToInfo")
+
+def _raw_zip_supported() -> bool:
+    if not hasattr(zipfile.ZipInfo, "FileHeader"):
+        return False
+    with zipfile.ZipFile(io.BytesIO(), "w") as z:
+        return all(hasattr(z, n) for n in ZIPFILE_INTERNALS)
+
+RAW_ZIP = _raw_zip_supported()
+
+def strip_zip64_extra(extra: bytes) -> bytes:
+    """去掉扩展字段中的 zip64 记录，写出时 FileHeader() 按实际大小重新生成"""
+    out, i = [], 0
+    while i + 4 <= len(extra):
+        tag, size = struct.unpack_from("<HH", extra, i)
+        if tag != ZIP64_EXTRA_ID:
+            out.append(extra[i:i + 4 + size])
+        i += 4 + size
+    out.append(extra[i:])   # 不足一条记录的尾部原样保留
+    return b"".join(out)
+
+def _fresh_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    """公开接口写入用：只带名字、时间、压缩方式和属性，大小与 CRC 由 zipfile 重新计算"""
+    new = zipfile.ZipInfo(info.filename, info.date_time)
+    new.compress_type = info.compress_type
+    new.external_attr = info.external_attr
+    new.create_system = info.create_system
+    new.comment = info.comment
+    return new
+
+def _append_member(zout: zipfile.ZipFile, new: zipfile.ZipInfo, chunks, level: int = None):
+    """在 zout 末尾写入本地文件头和已压缩的数据块，并登记到中央目录
+
+    RAW_ZIP 为 False 时 chunks 是 compress_member 原样返回的未压缩数据，交给 writestr 压缩
+    """
+    if not RAW_ZIP:
+        with DIAG.phase("save.write"):
+            zout.writestr(new, b"".join(chunks), compresslevel=level or None)
+        return
+    # 大小与 CRC 直接写进本地文件头，不再需要数据描述符
+    new.flag_bits &= ~DATA_DESCRIPTOR_FLAG
+    with DIAG.phase("save.write"), zout._lock:
+        new.header_offset = zout.fp.tell()
+        zout.fp.write(new.FileHeader())
+        for chunk in chunks:
+            zout.fp.write(chunk)
+        zout.filelist.append(new)
+        zout.NameToInfo[new.filename] = new
+        zout.start_dir = zout.fp.tell()
+        zout._didModify = True
+
+def copy_raw_member(zin: zipfile.ZipFile, info: zipfile.ZipInfo, zout: zipfile.ZipFile):
+    """把成员的原始压缩字节直接搬到 zout，不解压也不重新压缩"""
+    if not RAW_ZIP:
+        new = _fresh_info(info)
+        with DIAG.phase("save.write"), zin.open(info) as src, \
+                zout.open(new, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dst:
+            shutil.copyfileobj(src, dst, RAW_COPY_CHUNK)
+        return
+    zin.fp.seek(info.header_offset)
+    fh = LOCAL_HEADER.unpack(zin.fp.read(LOCAL_HEADER.size))
+    zin.fp.seek(info.header_offset + LOCAL_HEADER.size + fh[-2] + fh[-1])
+    new = copy.copy(info)
+    new.extra = strip_zip64_extra(info.extra)
+    def chunks():
+        left = info.compress_size
+        while left > 0:
+            chunk = zin.fp.read(min(RAW_COPY_CHUNK, left))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+            yield chunk
+            left -= len(chunk)
+    _append_member(zout, new, chunks())
+
+def compress_member(info: zipfile.ZipInfo, data: bytes, level: int = None) -> Tuple[zipfile.ZipInfo, bytes]:
+    """按 level 压缩一个成员，返回 (新的 ZipInfo, 压缩后字节)；zlib 压缩时释放 GIL，可在线程池中并行
+
+    level 为 None 时沿用原成员的存储 / deflate 方式和 zlib 默认级别，0 为仅存储，1-9 为 deflate 级别
+    """
+    with DIAG.phase("save.compress"):
+        return _compress_member(info, data, level)
+
+def _compress_member(info: zipfile.ZipInfo, data: bytes, level: int = None) -> Tuple[zipfile.ZipInfo, bytes]:
+    if not RAW_ZIP:
+        new = _fresh_info(info)
+        if level == 0 or (level is None and info.compress_type == zipfile.ZIP_STORED):
+            new.compress_type = zipfile.ZIP_STORED
+        else:
+            new.compress_type = zipfile.ZIP_DEFLATED
+        return new, data
+    new = copy.copy(info)
+    new.extra = strip_zip64_extra(info.extra)
+    new.file_size = len(data)
+    new.CRC = zlib.crc32(data)
+    if level == 0 or (level is None and info.compress_type == zipfile.ZIP_STORED):
+        new.compress_type = zipfile.ZIP_STORED
+        payload = data
+    else:
+        new.compress_type = zipfile.ZIP_DEFLATED
+        c = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if level is None else level, zlib.DEFLATED, -15)
+        payload = c.compress(data) + c.flush()
+    new.compress_size = len(payload)
+    return new, payload
+
+def replace_spans(text: str, edits: List[Tuple[int, int, str]]) -> str:
+    """edits: [(start, end, 替换内容)]，区间互不重叠"""
+    out = []
+    pos = 0
+    for start, end, new in sorted(edits):
+        out.append(text[pos:start])
+        out.append(new)
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
+
+def splice_translations(text: str, edits: List[Tuple[int, int, str, str]]) -> str:
+    """edits: [(start, end, 原文, 译文)]，按区间把译文写回原文本，其余字符原样保留
+
+    区间处的字面量解码后与原文不一致时返回 None，由调用方退回重新解析的方式；
+    译文按原字面量的引号（JSON 双引号或 SNBT 单引号）编码
+    """
+    pos = 0
+    for start, end, source, translated in sorted(edits):
+        if start < pos or end <= start or text[start] not in "\"'":
+            return None
+        if decode_literal(text[start:end]) != source:
+            return None
+        pos = end
+    return replace_spans(text, [(start, end, encode_literal(translated, text[start]))
+                                for start, end, source, translated in edits])
+
+def iter_translated_zip(zin: zipfile.ZipFile, store: EntryStore, out: str,
+                        index: Dict[str, Dict[str, int]] = None, level: int = None,
+                        workers: int = None) -> Iterator[Tuple[int, int]]:
+    """逐个成员写出译文包，每写完一个成员 yield (已完成成员数, 成员总数)
+
+    有译文的成员在主线程生成新内容后交给线程池压缩，写出仍按原成员顺序依次进行；
+    zin 为 DirectorySource 时没有现成的压缩数据可搬，其余成员也按 mmap 读出后交给线程池压缩；
+    先写到 out + ".tmp"，迭代到底才替换为 out，中途停止迭代（取消）或出错时删除临时文件
+    """
+    if index is None:
+        index = index_entries(store)
+    DIAG.count("save.translations", len(store.translations))
+    infos = zin.infolist()
+    workers = workers or os.cpu_count() or 1
+    window = workers * COMPRESS_WINDOW_PER_WORKER
+    pool = ThreadPoolExecutor(workers) if workers > 1 else None
+    pending = deque()   # [(原 ZipInfo, 压缩任务或 None)]，None 表示原样搬运
+    done = 0
+    tmp = out + ".tmp"
+    ok = False
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zout:
+            def flush(block: bool):
+                nonlocal done
+                while pending and (block or pending[0][1] is None or pending[0][1].done()):
+                    info, job = pending.popleft()
+                    if job is None:
+                        copy_raw_member(zin, info, zout)
+                        DIAG.count("members.copied")
+                    else:
+                        new, payload = job.result()
+                        _append_member(zout, new, (payload,), level)
+                        DIAG.count("members.compressed")
+                    done += 1
+                    yield done, len(infos)
+            for info in infos:
+                with DIAG.phase("save.translate"):
+                    data = translate_member(zin, info, store, index.get(info.filename))
+                if data is None and isinstance(zin, DirectorySource):
+                    data = zin.view(info)
+                if data is None:
+                    pending.append((info, None))
+                elif pool is None:
+                    job = Future()
+                    job.set_result(compress_member(info, data, level))
+                    pending.append((info, job))
+                else:
+                    pending.append((info, pool.submit(compress_member, info, data, level)))
+                yield from flush(False)
+                while len(pending) > window:
+                    yield from flush(True)
+            yield from flush(True)
+        DIAG.count("bytes.written", os.path.getsize(tmp))
+        os.replace(tmp, out)
+        ok = True
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if not ok:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+def iter_translated_dir(src, store: EntryStore, out: str,
+                        index: Dict[str, Dict[str, int]] = None) -> Iterator[Tuple[int, int]]:
+    """把译文包写成目录，每写完一个成员 yield (已完成成员数, 成员总数)
+
+    有译文的成员写入新内容，其余成员原样复制；先写到 out + ".tmp"，完成后整体替换 out，
+    中途停止迭代（取消）或出错时删除临时目录
+    """
+    if index is None:
+        index = index_entries(store)
+    infos = src.infolist()
+    tmp = out + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    ok = False
+    try:
+        for done, info in enumerate(infos, 1):
+            parts = info.filename.split("/")
+            if info.filename.startswith("/") or ".." in parts:
+                print("skip unsafe member:", info.filename)
+                yield done, len(infos)
+                continue
+            dest = os.path.join(tmp, *parts)
+            if info.is_dir():
+                os.makedirs(dest, exist_ok=True)
+                yield done, len(infos)
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with DIAG.phase("save.translate"):
+                data = translate_member(src, info, store, index.get(info.filename))
+            with DIAG.phase("save.write"):
+                if data is not None:
+                    with open(dest, "wb") as f:
+                        f.write(data)
+                    DIAG.count("members.rewritten")
+                elif isinstance(src, DirectorySource):
+                    shutil.copy2(src.path(info), dest)
+                    DIAG.count("members.copied")
+                else:
+                    with src.open(info) as fin, open(dest, "wb") as fout:
+                        shutil.copyfileobj(fin, fout, RAW_COPY_CHUNK)
+                    DIAG.count("members.copied")
+            yield done, len(infos)
+        old = out + ".old"
+        if os.path.isdir(out):
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(out, old)
+        os.replace(tmp, out)
+        shutil.rmtree(old, ignore_errors=True)
+        ok = True
+    finally:
+        if not ok:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+def iter_translated(src, store: EntryStore, out: str, index: Dict[str, Dict[str, int]] = None,
+                    level: int = None, workers: int = None) -> Iterator[Tuple[int, int]]:
+    """out 以 .zip 结尾时写 zip，否则写成目录（level / workers 只对 zip 有效）"""
+    if out.lower().endswith(".zip"):
+        return iter_translated_zip(src, store, out, index, level, workers)
+    return iter_translated_dir(src, store, out, index)
+
+def build_translated_zip(zin: zipfile.ZipFile, store: EntryStore, out: str,
+                         index: Dict[str, Dict[str, int]] = None, level: int = None, workers: int = None):
+    for _ in iter_translated_zip(zin, store, out, index, level, workers):
+        pass
+
+def translate_member(zin: zipfile.ZipFile, info: zipfile.ZipInfo, store: EntryStore,
+                     rows: Dict[str, int] = None) -> bytes:
+    """返回写入译文后的成员内容；没有译文（或加密）的成员返回 None，由调用方原样搬运
+
+    有区间的按区间替换，区间失配时退回重新解析
+    """
+    translations = store.translations
+    touched = [r for r in rows.values() if r in translations] if rows else None
+    if not touched or info.flag_bits & 0x1:
+        return None
+    data = None
+    text = read_text(zin, info, "replace")
+    new = None
+    if all(store.end_col[r] for r in touched):
+        new = splice_translations(text, [(store.start_col[r], store.end_col[r], store.texts[r],
+                                          translations[r]) for r in touched])
+    if new is not None:
+        data = new.encode("utf-8")
+    elif info.filename.endswith(".json"):
+        by_path = {store[r].path: store[r] for r in touched}
+        try:
+            obj = json.loads(text)
+            apply_json_translation(obj, by_path)
+            data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        except: pass
+    elif info.filename.endswith(".mcfunction"):
+        by_path = {store[r].path: store[r] for r in touched}
+        data = apply_mcfunction_translation(text, by_path).encode("utf-8")
+    return data
+
+def apply_json_translation(obj, by_path: Dict[str, Entry]):
+    def walk(node, path=""):
+        if isinstance(node, dict):
+            for k, v in node.items():
+                if k in JSON_FIELDS:
+                    if isinstance(v, str):
+                        map_path = f"{path}.{k}" if path else k
+                        ent = by_path.get(map_path)
+                        if ent and ent.translated:
+                            node[k] = ent.translated
+                    elif isinstance(v, list) and all(isinstance(i, str) for i in v):
+                        for idx, s in enumerate(v):
+                            map_path = f"{path}.{k}[{idx}]" if path else f"{k}[{idx}]"
+                            ent = by_path.get(map_path)
+                            if ent and ent.translated:
+                                v[idx] = ent.translated
+                    else:
+                        walk(v, f"{path}.{k}" if path else k)
+                else:
+                    walk(v, f"{path}.{k}" if path else k)
+        elif isinstance(node, list):
+            for idx, item in enumerate(node):
+                walk(item, f"{path}[{idx}]" if path else f"[{idx}]")
+    walk(obj)
+    
+def apply_mcfunction_translation(content: str, by_path: Dict[str, Entry]) -> str:
+    """重新扫描全文定位各条目；写在字符串里的 JSON 组件先改内层再按外层引号重新编码"""
+    edits = []
+    nested: Dict[Tuple[int, int], list] = {}
+    for text, path, cmd, field, start, end, box in scan_mcfunction(content, COMMAND_TYPES):
+        e = by_path.get(path)
+        if e is None or not e.translated or e.text != text:
+            continue
+        if box is None:
+            edits.append((start, end, encode_literal(e.translated, content[start])))
+        else:
+            nested.setdefault(box, []).append((start, end, e.translated))
+    for (start, end), inner in nested.items():
+        value = decode_literal(content[start:end])
+        value = replace_spans(value, [(a, b, encode_literal(t, value[a])) for a, b, t in inner])
+        edits.append((start, end, encode_literal(value, content[start])))
+    return replace_spans(content, edits)
+
+# -------------------- 并行抽取 --------------------
+PARALLEL_MIN_MEMBERS = 256   # 成员数少于此值时进程池的启动开销不划算
+
+def is_text_member(name: str) -> bool:
+    return name.endswith(".json") or name.endswith(".mcfunction")
+
+def member_namespace(name: str) -> str:
+    """从成员路径 data/<ns>/... 取命名空间（允许外面再套一层目录），不在 data/ 下时返回 None"""
+    parts = name.split("/")
+    if len(parts) > 2 and parts[0] == "data":
+        return parts[1]
+    if len(parts) > 3 and parts[1] == "data":
+        return parts[2]
+    return None
+
+class NamespaceFilter:
+    """按成员路径判定是否需要解析；include 非空时只保留其中的命名空间，exclude 中的一律跳过"""
+    def __init__(self, include=(), exclude=()):
+        self.include = set(include)
+        self.exclude = set(exclude)
+    def __call__(self, name: str) -> bool:
+        ns = member_namespace(name)
+        if ns is None:
+            return True
+        if self.include and ns not in self.include:
+            return False
+        return ns not in self.exclude
+
+def extract_member(z: zipfile.ZipFile, name: str, jf: set, cf: set) -> List[Row]:
+    DIAG.count("members.parsed")
+    if name.endswith(".json"):
+        return extract_json_entries(z, name, jf)
+    if name.endswith(".mcfunction"):
+        return parse_mcfunction(z, name, cf)
+    return []
+
+def _extract_batch(zpath: str, names: List[str], jf: set, cf: set, diag: bool = False):
+    """子进程入口：自行打开 zip / 目录，返回 (按成员的记录, 本批诊断数据或 None)，文件名由主进程补上"""
+    DIAG.enabled = diag
+    DIAG.reset()
+    with DIAG.phase("zip.open"):
+        z = open_source(zpath)
+    with z:
+        rows = [extract_member(z, name, jf, cf) for name in names]
+    return rows, DIAG.raw() if diag else None
+
+def _ordered_batches(infos: List[zipfile.ZipInfo], cached: Dict[str, List[Row]], fetch, batch_members: int,
+                     cache: "ParseCache" = None, cancelled=None):
+    """按成员顺序合并缓存命中与新抽取的记录，每 batch_members 个成员产出一批；cancelled() 为真时在成员边界停下"""
+    total = len(infos)
+    batch = []
+    for done, info in enumerate(infos, 1):
+        if cancelled is not None and cancelled():
+            return
+        rows = cached.get(info.filename)
+        if rows is None:
+            rows = fetch(info.filename)
+            if cache is not None:
+                cache.put(info, rows)
+        batch.append((info.filename, rows))
+        if done % batch_members == 0 or done == total:
+            yield batch, done, total
+            batch = []
+
+def iter_entry_batches(zpath: str, jf: set, cf: set, workers: int = None, batch_members: int = 32,
+                       cache: "ParseCache" = None, member_filter=None, cancelled=None
+                       ) -> Iterator[Tuple[List[Tuple[str, List[Row]]], int, int]]:
+    """按成员顺序分批产出 ([(成员名, 记录)], 已完成成员数, 成员总数)，首批在读完少量成员后即可送达
+
+    给出 cache 时，CRC 与大小未变的成员直接取缓存，只有变动的成员才会解压抽取；
+    member_filter 只看中央目录里的成员名，被拒绝的成员不会被读取；
+    cancelled() 为真时在下一个成员边界结束，尚未开始的子进程任务被取消，缓存不写回
+    """
+    with DIAG.phase("zip.open"):
+        z = open_source(zpath)
+    with z:
+        with DIAG.phase("zip.list"):
+            infos = [i for i in z.infolist() if is_text_member(i.filename)]
+        if member_filter is not None:
+            kept = [i for i in infos if member_filter(i.filename)]
+            if cache is not None and len(kept) != len(infos):
+                # 跳过的成员也登记一次，缓存保存时不会把它们丢掉
+                kept_names = set(i.filename for i in kept)
+                for info in infos:
+                    if info.filename not in kept_names:
+                        cache.get(info)
+            infos = kept
+        cached = {}
+        if cache is not None:
+            for info in infos:
+                rows = cache.get(info)
+                if rows is not None:
+                    cached[info.filename] = rows
+            DIAG.count("members.cached", len(cached))
+        misses = [i.filename for i in infos if i.filename not in cached]
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(misses) < PARALLEL_MIN_MEMBERS:
+            yield from _ordered_batches(infos, cached, lambda name: extract_member(z, name, jf, cf),
+                                        batch_members, cache, cancelled)
+            if cache is not None and not (cancelled is not None and cancelled()):
+                cache.save()
+            return
+    from concurrent.futures import ProcessPoolExecutor   # 用到进程池时才导入 multiprocessing 一族
+    import multiprocessing
+    # 界面从 QThread 里调用：多线程进程 fork 出的子进程可能卡在 fork 时别的线程持有的锁上，一律用 spawn
+    context = multiprocessing.get_context("spawn")
+    size = max(1, min(batch_members, len(misses) // (workers * 8)))
+    batches = [misses[i:i + size] for i in range(0, len(misses), size)]
+    owner = {name: bi for bi, names in enumerate(batches) for name in names}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(_extract_batch, zpath, b, jf, cf, DIAG.enabled) for b in batches]
+        results = {}
+        def fetch(name):
+            bi = owner[name]
+            if bi not in results:
+                rows, stats = futures[bi].result()
+                DIAG.merge(stats)
+                results[bi] = dict(zip(batches[bi], rows))
+            return results[bi].pop(name)
+        try:
+            yield from _ordered_batches(infos, cached, fetch, batch_members, cache, cancelled)
+        finally:
+            # 取消或提前关闭时不再等待排队中的批次
+            pool.shutdown(wait=False, cancel_futures=True)
+    if cache is not None and not (cancelled is not None and cancelled()):
+        cache.save()
+
+def extract_entries(zpath: str, jf: set, cf: set, workers: int = None,
+                    cache: "ParseCache" = None) -> EntryStore:
+    """抽取整个数据包，结果顺序与成员顺序一致；成员较多时分批交给进程池"""
+    store = EntryStore()
+    for batch, _, _ in iter_entry_batches(zpath, jf, cf, workers, cache=cache):
+        for name, rows in batch:
+            store.add(name, rows)
+    return store
+
+# -------------------- 解析缓存 --------------------
+class ParseCache:
+    """按 (成员名, CRC32, 大小, 字段设置) 缓存抽取结果，每个数据包对应缓存目录下的一个文件"""
+    VERSION = 4   # 抽取规则改动（如 mcfunction 扫描新增条目、路径变化）时加一，旧缓存作废
+    def __init__(self, cache_dir, zpath: str, jf: set, cf: set):
+        digest = hashlib.sha1(os.path.abspath(zpath).encode("utf-8")).hexdigest()
+        self.file = pathlib.Path(cache_dir) / f"{digest}.cache"
+        self.settings = (tuple(sorted(jf)), tuple(sorted(cf)))
+        self.members: Dict[str, Tuple[int, int, List[Row]]] = {}
+        self.fresh: Dict[str, Tuple[int, int, List[Row]]] = {}
+        try:
+            with DIAG.phase("cache.load"), open(self.file, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == self.VERSION and data.get("settings") == self.settings:
+                self.members = data["members"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print("Cache load fail:", self.file, e)
+    def get(self, info: zipfile.ZipInfo):
+        hit = self.members.get(info.filename)
+        if hit is not None and hit[0] == info.CRC and hit[1] == info.file_size:
+            self.fresh[info.filename] = hit
+            return hit[2]
+        return None
+    def put(self, info: zipfile.ZipInfo, rows: List[Row]):
+        self.fresh[info.filename] = (info.CRC, info.file_size, rows)
+    def save(self):
+        """只保留本次解析到的成员，先写临时文件再替换"""
+        data = {"version": self.VERSION, "settings": self.settings, "members": self.fresh}
+        try:
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.file.with_suffix(".tmp")
+            with DIAG.phase("cache.save"), open(tmp, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.file)
+            self.members = self.fresh
+        except Exception as e:
+            print("Cache save fail:", self.file, e)
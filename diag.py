@@ -0,0 +1,149 @@
+"""性能诊断：按阶段累计耗时与计数，可导出为 JSON（不依赖 Qt）
+
+设置环境变量 MCDT_DIAG=1 或在设置中勾选后启用；未启用时 phase() 返回共享的空上下文，count() 直接返回，
+解析与保存路径上几乎没有额外开销。进程池中的子进程各自计数，由主进程用 merge() 合并
+"""
+import json, os, time, threading, contextlib, pathlib
+from typing import Dict, List
+
+ENV_VAR = "MCDT_DIAG"
+
+class _Phase:
+    __slots__ = ("diag", "name", "t0")
+    def __init__(self, diag: "Diagnostics", name: str):
+        self.diag = diag
+        self.name = name
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        self.diag.add_time(self.name, time.perf_counter() - self.t0)
+
+_NULL_PHASE = contextlib.nullcontext()
+
+class Diagnostics:
+    """timings: {阶段: [次数, 总秒数, 单次最长秒数]}，counters: {名称: 数值}；压缩线程也会写入，所以加锁"""
+    def __init__(self, enabled: bool = None):
+        self.enabled = bool(os.environ.get(ENV_VAR)) if enabled is None else enabled
+        self.timings: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.captures: List[str] = []   # 最近一次 capture() 写出的文件
+        self._lock = threading.Lock()
+
+    def phase(self, name: str):
+        """with DIAG.phase("json.decode"): ... 计入该阶段的次数与耗时"""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        with self._lock:
+            t = self.timings.get(name)
+            if t is None:
+                self.timings[name] = [calls, seconds, seconds]
+            else:
+                t[0] += calls
+                t[1] += seconds
+                if seconds > t[2]:
+                    t[2] = seconds
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.counters.clear()
+
+    def raw(self) -> dict:
+        """可 pickle 的原始数据，子进程返回给主进程 merge()"""
+        with self._lock:
+            return {"timings": {k: list(v) for k, v in self.timings.items()}, "counters": dict(self.counters)}
+
+    def merge(self, raw: dict):
+        if not raw:
+            return
+        for name, (calls, total, longest) in raw["timings"].items():
+            self.add_time(name, total, calls)
+            with self._lock:
+                t = self.timings[name]
+                t[2] = max(t[2], longest)
+        with self._lock:
+            for name, n in raw["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        """导出用：耗时换算成毫秒，按阶段名排序"""
+        raw = self.raw()
+        return {
+            "timings": {k: {"calls": int(c), "total_ms": round(t * 1000, 3), "max_ms": round(m * 1000, 3)}
+                        for k, (c, t, m) in sorted(raw["timings"].items())},
+            "counters": dict(sorted(raw["counters"].items())),
+            "captures": list(self.captures),
+        }
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def report(self) -> str:
+        """对齐的纯文本表格，供诊断面板和命令行输出"""
+        snap = self.snapshot()
+        lines = [f"{'phase':<24}{'calls':>10}{'total ms':>14}{'avg ms':>12}{'max ms':>12}"]
+        for name, t in snap["timings"].items():
+            avg = t["total_ms"] / t["calls"] if t["calls"] else 0.0
+            lines.append(f"{name:<24}{t['calls']:>10}{t['total_ms']:>14.1f}{avg:>12.3f}{t['max_ms']:>12.1f}")
+        if snap["counters"]:
+            lines.append("")
+            lines.append(f"{'counter':<24}{'value':>10}")
+            lines.extend(f"{name:<24}{n:>10}" for name, n in snap["counters"].items())
+        if snap["captures"]:
+            lines.append("")
+            lines.extend(snap["captures"])
+        return "\n".join(lines)
+
+    @contextlib.contextmanager
+    def capture(self, out_dir, label: str, profile: bool = False, memory: bool = False):
+        """在当前线程对一次解析 / 保存做 cProfile 或 tracemalloc 采样，结果写到 out_dir
+
+        cProfile 只统计调用 capture 的线程，进程池里的抽取和压缩线程不在其中
+        """
+        if not (profile or memory):
+            yield
+            return
+        import cProfile, pstats, io, tracemalloc   # 只有采样时才用到，不拖慢启动
+        out_dir = pathlib.Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = out_dir / f"{label}-{time.strftime('%Y%m%d-%H%M%S')}"
+        prof = cProfile.Profile() if profile else None
+        started = memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        if prof is not None:
+            prof.enable()
+        try:
+            yield
+        finally:
+            files = []
+            if prof is not None:
+                prof.disable()
+                prof.dump_stats(f"{stem}.prof")
+                text = io.StringIO()
+                pstats.Stats(prof, stream=text).sort_stats("cumulative").print_stats(40)
+                pathlib.Path(f"{stem}.prof.txt").write_text(text.getvalue(), encoding="utf-8")
+                files += [f"{stem}.prof", f"{stem}.prof.txt"]
+            if memory:
+                current, peak = tracemalloc.get_traced_memory()
+                top = tracemalloc.take_snapshot().statistics("lineno")[:40]
+                if started:
+                    tracemalloc.stop()
+                pathlib.Path(f"{stem}.mem.txt").write_text(
+                    f"current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n"
+                    + "\n".join(str(s) for s in top), encoding="utf-8")
+                files.append(f"{stem}.mem.txt")
+            self.captures = files
+
+DIAG = Diagnostics()
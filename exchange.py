@@ -0,0 +1,246 @@
+"""译文交换：把条目表导出为 CSV / XLIFF / lang JSON 交给外部翻译工具，再按 (文件, 路径) 导回（不依赖 Qt）
+
+导出与读取都是生成器，逐行写出、逐条读入，几十万行的文件也不会整份放进内存：
+  CSV        file, path, source, target 四列，UTF-8 带 BOM，Excel 可直接打开
+  XLIFF 1.2  每个数据包成员一个 <file original=成员名>，trans-unit 的 id 为路径
+  lang JSON  扁平的 {"成员名#路径": 文本}，已翻译的写译文，否则写原文；导回时与原文相同的值视为未翻译
+导回时用 index_entries 的哈希索引逐条合并，报告数据包中已不存在的键和原文已改动（未导入）的键；
+lang JSON 不带原文，而 mcfunction 的路径按行号记，上游插入一行后同一个键就是另一句原文，这类键不导入、单独报告
+"""
+import csv, itertools, json, os, re
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from datapack import EntryStore, index_entries
+
+Record = Tuple[str, str, Optional[str], str]   # (文件, 路径, 导出时的原文或 None, 译文)
+
+CSV_HEADER = ("file", "path", "source", "target")
+XLIFF_NS = "urn:oasis:names:tc:xliff:document:1.2"
+RE_LANG_KEY = re.compile(r"(.*?\.(?:json|mcfunction))#(.*)", re.S)   # 成员名都以 .json / .mcfunction 结尾
+RE_SPACE = re.compile(r"\s*")
+JSON_DECODER = json.JSONDecoder()
+XML_ENTITIES = {"\r": "&#13;"}   # 不转义的话 XML 解析器会把 \r\n 归一成 \n
+READ_CHUNK = 1 << 16
+
+def lang_key(file: str, path: str) -> str:
+    return f"{file}#{path}"
+
+
+# -------------------- 导出 --------------------
+class _Echo:
+    """csv.writer 的目标：writerow() 直接返回写出的那一行"""
+    def write(self, line: str) -> str:
+        return line
+
+def iter_csv(store: EntryStore, rows: Iterable[int]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    files, paths, texts, translations = store.files, store.paths, store.texts, store.translations
+    yield writer.writerow(CSV_HEADER)
+    for r in rows:
+        yield writer.writerow((files[store.file_col[r]], paths[store.path_col[r]], texts[r], translations.get(r, "")))
+
+def iter_xliff(store: EntryStore, rows: Iterable[int], source_lang: str = "en", target_lang: str = "zh-CN") -> Iterator[str]:
+    """同一成员的连续行放在一个 <file> 里；已有译文的写 <target>"""
+    files, paths, texts, translations = store.files, store.paths, store.texts, store.translations
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<xliff version="1.2" xmlns="{XLIFF_NS}">\n'
+    current = None
+    for r in rows:
+        fid = store.file_col[r]
+        if fid != current:
+            if current is not None:
+                yield "</body></file>\n"
+            yield (f"<file original={quoteattr(files[fid])} source-language={quoteattr(source_lang)} "
+                   f"target-language={quoteattr(target_lang)} datatype=\"plaintext\"><body>\n")
+            current = fid
+        target = translations.get(r)
+        target = f"<target>{escape(target, XML_ENTITIES)}</target>" if target else ""
+        yield (f'<trans-unit id={quoteattr(paths[store.path_col[r]])} xml:space="preserve">'
+               f"<source>{escape(texts[r], XML_ENTITIES)}</source>{target}</trans-unit>\n")
+    if current is not None:
+        yield "</body></file>\n"
+    yield "</xliff>\n"
+
+def iter_lang_json(store: EntryStore, rows: Iterable[int]) -> Iterator[str]:
+    files, paths, texts, translations = store.files, store.paths, store.texts, store.translations
+    sep = "{\n"
+    for r in rows:
+        key = lang_key(files[store.file_col[r]], paths[store.path_col[r]])
+        yield f"{sep}  {json.dumps(key, ensure_ascii=False)}: {json.dumps(translations.get(r) or texts[r], ensure_ascii=False)}"
+        sep = ",\n"
+    yield "{}\n" if sep == "{\n" else "\n}\n"
+
+
+# -------------------- 读取 --------------------
+def read_csv(f) -> Iterator[Record]:
+    """按表头找列（source 列可以没有）；没有表头时按 file, path, source, target 的顺序"""
+    reader = csv.reader(f)
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [c.strip().lower() for c in first]
+    if {"file", "path", "target"} <= set(header):
+        fi, pi, ti = header.index("file"), header.index("path"), header.index("target")
+        si = header.index("source") if "source" in header else None
+    else:
+        fi, pi, si, ti = range(len(CSV_HEADER))
+        reader = itertools.chain([first], reader)
+    for row in reader:
+        if len(row) > max(fi, pi, ti):
+            yield row[fi], row[pi], row[si] if si is not None and si < len(row) else None, row[ti]
+
+def read_xliff(f) -> Iterator[Record]:
+    """iterparse 逐个读出 trans-unit，读完即从父元素上摘掉，树不会随文件变大；f 为二进制文件"""
+    original = None
+    stack = []
+    for event, elem in ET.iterparse(f, events=("start", "end")):
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if event == "start":
+            stack.append(elem)
+            if tag == "file":
+                original = elem.get("original")
+            continue
+        stack.pop()
+        if tag != "trans-unit":
+            continue
+        source = target = None
+        for child in elem:
+            name = child.tag.rsplit("}", 1)[-1]
+            if name == "source":
+                source = "".join(child.itertext())
+            elif name == "target":
+                target = "".join(child.itertext())
+        if original is not None and elem.get("id") is not None:
+            yield original, elem.get("id"), source, target or ""
+        if stack:
+            stack[-1].remove(elem)
+
+class _JsonStream:
+    """按块读取文本文件，逐个解码 JSON 值；值恰好停在已读内容末尾时先多读一块再解码，避免截断"""
+    def __init__(self, f, chunk: int = READ_CHUNK):
+        self.f = f
+        self.chunk = chunk
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+    def more(self) -> bool:
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+    def peek(self) -> str:
+        """跳过空白后的下一个字符，读到末尾时为空串"""
+        while True:
+            self.pos = RE_SPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"expected one of {chars!r} at {self.pos}, got {c!r}")
+        self.pos += 1
+        return c
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = JSON_DECODER.raw_decode(self.buf, self.pos)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.more()
+
+def read_lang_json(f) -> Iterator[Record]:
+    """扁平 JSON 对象逐对读出；键不是 成员名#路径 形式的原样作为文件名报告为缺失"""
+    stream = _JsonStream(f)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        value = stream.value()
+        if isinstance(key, str) and isinstance(value, str):
+            m = RE_LANG_KEY.fullmatch(key)
+            yield (m.group(1), m.group(2), None, value) if m else (key, "", None, value)
+        if stream.expect(",}") == "}":
+            return
+
+
+# -------------------- 合并 --------------------
+class ImportReport:
+    """applied 为写入了译文的行号；missing 为数据包中已不存在的 (文件, 路径)，stale 为原文已改动、未导入的，
+    unverified 为没有原文可核对（lang JSON）的 mcfunction 键，未导入"""
+    def __init__(self):
+        self.applied: List[int] = []
+        self.unchanged = 0
+        self.skipped = 0   # 译文为空，或 lang JSON 中与原文相同
+        self.missing: List[Tuple[str, str]] = []
+        self.stale: List[Tuple[str, str]] = []
+        self.unverified: List[Tuple[str, str]] = []
+
+def merge_translations(store: EntryStore, records: Iterable[Record],
+                       index: Dict[str, Dict[str, int]] = None) -> ImportReport:
+    """逐条按 (文件, 路径) 查哈希索引写入译文，耗时与记录数成正比；空译文不会清掉已有译文"""
+    index = index_entries(store) if index is None else index
+    texts, translations = store.texts, store.translations
+    report = ImportReport()
+    for file, path, source, target in records:
+        row = index.get(file, {}).get(path)
+        if row is None:
+            report.missing.append((file, path))
+        elif source is None and file.endswith(".mcfunction"):
+            report.unverified.append((file, path))
+        elif source is not None and source != texts[row]:
+            report.stale.append((file, path))
+        elif not target or (source is None and target == texts[row]):
+            report.skipped += 1
+        elif translations.get(row) == target:
+            report.unchanged += 1
+        else:
+            translations[row] = target
+            report.applied.append(row)
+    return report
+
+
+# -------------------- 文件 --------------------
+EXPORTERS = {".csv": iter_csv, ".xlf": iter_xliff, ".xliff": iter_xliff, ".json": iter_lang_json}
+
+def file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXPORTERS:
+        raise ValueError(f"unsupported format: {ext or path}")
+    return ext
+
+def export_translations(path: str, store: EntryStore, rows: Sequence[int]) -> int:
+    """按扩展名选择格式写出 rows，先写临时文件再替换；返回写出的条数"""
+    exporter = EXPORTERS[file_format(path)]
+    tmp = path + ".tmp"
+    encoding = "utf-8-sig" if exporter is iter_csv else "utf-8"
+    with open(tmp, "w", encoding=encoding, newline="") as f:
+        f.writelines(exporter(store, rows))
+    os.replace(tmp, path)
+    return len(rows)
+
+def read_records(path: str) -> Iterator[Record]:
+    ext = file_format(path)
+    if ext in (".xlf", ".xliff"):
+        with open(path, "rb") as f:
+            yield from read_xliff(f)
+        return
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        yield from (read_csv(f) if ext == ".csv" else read_lang_json(f))
+
+def import_translations(path: str, store: EntryStore, index: Dict[str, Dict[str, int]] = None) -> ImportReport:
+    return merge_translations(store, read_records(path), index)
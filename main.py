@@ -1,83 +1,228 @@
-import json, re, zipfile, os, sys, pathlib, shutil
-from typing import List, Dict, Union
+import multiprocessing
+if __name__ == "__main__":
+    multiprocessing.freeze_support()   # 打包版的解析子进程在这里接手并退出，不再导入下面的 Qt / Fluent
+
+import json, os, sys, pathlib, functools
+from array import array
+from typing import List, Dict
+
+from datapack import (EntryStore, JSON_FIELDS, COMMAND_TYPES,
+                      ParseCache, NamespaceFilter, iter_entry_batches, index_entries, iter_translated,
+                      open_source, default_output, is_text_member)
+from tm import TranslationMemory
+from search import SearchIndex, Query
+from exchange import export_translations, import_translations, merge_translations
+from diag import DIAG, ENV_VAR
+from project import ProjectFile, EXTENSION as PROJECT_EXT
 
 # -------------------- Fluent --------------------
 from qfluentwidgets import (setTheme, Theme, setThemeColor,
-                            PrimaryPushButton, PushButton, TableWidget, CheckBox,
-                            ComboBox, CaptionLabel, MessageBox, Dialog, SubtitleLabel,
-                            FluentIcon as FI)
+                            PrimaryPushButton, PushButton, TableView, TreeView, CheckBox, SearchLineEdit,
+                            ComboBox, CaptionLabel, MessageBox, SubtitleLabel, LineEdit, ListWidget,
+                            PlainTextEdit, FluentIcon as FI)
 # -------------------- PyQt6 --------------------
 from PyQt6.QtWidgets import (QApplication,QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QHeaderView, QLabel, QFileDialog, QMenuBar, QMenu,QDialog,
-                            QDialogButtonBox, QSplitter,QTableWidgetItem)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSettings, QStandardPaths
-from PyQt6.QtGui import QIcon, QKeySequence as QKS,QAction, QKeySequence
+                             QFileDialog, QMenu,QDialog,
+                            QDialogButtonBox, QSplitter, QListWidgetItem, QStackedWidget)
+from PyQt6.QtCore import (Qt, QThread, pyqtSignal, QSettings, QStandardPaths, QTimer, QFileSystemWatcher,
+                          QAbstractTableModel, QAbstractItemModel, QModelIndex)
+from PyQt6.QtGui import QIcon, QKeySequence as QKS,QAction
 
 # -------------------- 多语言 --------------------
+@functools.lru_cache(maxsize=None)
 def get_lang_dir() -> "pathlib.Path":
+    """语言文件目录：程序自带的 langs/，没有时用配置目录下的 langs/；只读，不创建也不写入"""
     if getattr(sys, 'frozen', False):
         base = pathlib.Path(sys._MEIPASS)
     else:
         base = pathlib.Path(__file__).parent
     built_in = base / "langs"
-    if built_in.exists() and any(built_in.glob("*.json")):
+    if built_in.is_dir():
         return built_in
-    config = pathlib.Path(QStandardPaths.writableLocation(
-        QStandardPaths.StandardLocation.AppConfigLocation)) / "MCDatapackTranslator"
-    config.mkdir(parents=True, exist_ok=True)
-    dest = config / "langs"
-    dest.mkdir(exist_ok=True)
-    zh_cn = dest / "zh_CN.json"
-    if not zh_cn.exists():
-        zh_cn.write_text(json.dumps({
-            "app_title": "MC 数据包翻译工具",
-            "lang_name": "中文",
-            "menu_file": "文件",
-            "menu_open": "打开数据包",
-            "menu_exit": "退出",
-            "menu_edit": "编辑",
-            "menu_settings": "设置",
-            "menu_help": "帮助",
-            "menu_about": "关于",
-            "col_file": "文件",
-            "col_path": "路径/行号",
-            "col_source": "原文",
-            "col_trans": "译文",
-            "setting_show_vanilla": "显示原版命名空间(minecraft:)",
-            "setting_lang": "界面语言",
-            "btn_load": "加载数据包",
-            "btn_save": "保存翻译",
-            "btn_theme": "切换主题",
-            "json_field": "JSON 字段",
-            "mcfunction_command": "MCFunction 命令",
-            "status_ready": "拖拽数据包到窗口即可开始",
-            "status_parsing": "解析中…",
-            "status_done": "解析完成，共 {} 条可翻译文本",
-            "tip": "提示",
-            "close_current": "关闭当前文件",
-            "not_opened": "尚未打开任何数据包",
-            "S_Closed": "已关闭数据包",
-            "recent_files": "最近打开",
-            "empty": "无",
-            "file_no_longer_exists\n{}": "文件不存在\n{}",
-            "save_ok": "已保存为\n{}",
-            "about_text": "MC 数据包翻译工具\n支持全版本 Java 版数据包\n作者：Ace"
-        }, ensure_ascii=False, indent=2), encoding="utf-8")
-    return dest
-
-LANG_PATH = get_lang_dir()
+    return get_config_dir() / "langs"
+
 DEFAULT_LANG = "zh_CN"
 
+def get_config_dir() -> "pathlib.Path":
+    return pathlib.Path(QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.AppConfigLocation)) / "MCDatapackTranslator"
+
+def get_cache_dir() -> "pathlib.Path":
+    return get_config_dir() / "cache"
+
+def get_diag_dir() -> "pathlib.Path":
+    return get_config_dir() / "diagnostics"
+
+BUILTIN_LANGS = {   # 内置文字表：语言文件缺失或缺键时使用
+    "zh_CN": {
+        "app_title": "MC 数据包翻译工具",
+        "lang_name": "中文",
+        "menu_file": "文件",
+        "menu_open": "打开数据包",
+        "menu_open_dir": "打开数据包文件夹",
+        "menu_open_project": "打开项目",
+        "menu_save_project": "保存项目",
+        "menu_export": "导出译文",
+        "menu_import": "导入译文",
+        "export_done": "已导出 {} 条到 {}",
+        "import_done": "已导入 {} 条译文",
+        "import_report": "导入 {} 条，与现有译文相同 {} 条\n数据包中已不存在的键 {} 条\n原文已改动、未导入 {} 条\n没有原文可核对的 mcfunction 键（lang JSON）、未导入 {} 条\n{}",
+        "exchange_fail": "导出 / 导入失败\n{}",
+        "project_saved": "项目已保存到 {}",
+        "project_fail": "项目文件读写失败\n{}",
+        "status_source_changed": "检测到文件改动，正在重新解析…",
+        "menu_exit": "退出",
+        "menu_edit": "编辑",
+        "menu_settings": "设置",
+        "menu_help": "帮助",
+        "menu_about": "关于",
+        "menu_diagnostics": "诊断信息",
+        "setting_diagnostics": "记录性能诊断数据（各阶段耗时与计数）",
+        "diag_profile": "下次解析 / 保存时采集 cProfile",
+        "diag_memory": "下次解析 / 保存时采集 tracemalloc",
+        "diag_refresh": "刷新",
+        "diag_reset": "清零",
+        "diag_export": "导出 JSON",
+        "diag_disabled": "诊断未启用：在设置中勾选，或设置环境变量 MCDT_DIAG=1 后启动",
+        "col_file": "文件",
+        "col_path": "路径/行号",
+        "col_source": "原文",
+        "col_trans": "译文",
+        "setting_show_vanilla": "显示原版命名空间(minecraft:)",
+        "setting_ns_include": "仅解析这些命名空间（逗号分隔，留空为全部）",
+        "setting_ns_exclude": "跳过这些命名空间（逗号分隔）",
+        "setting_compress_level": "输出压缩级别",
+        "compress_default": "默认",
+        "compress_store": "仅存储（最快）",
+        "setting_lang": "界面语言",
+        "btn_load": "加载数据包",
+        "btn_save": "保存翻译",
+        "btn_theme": "切换主题",
+        "group_by_source": "按原文分组",
+        "search_placeholder": "筛选：原文 / 译文，file:文件前缀 path:路径前缀",
+        "filter_untranslated": "仅未翻译",
+        "filter_all_ns": "全部命名空间",
+        "json_field": "JSON 字段",
+        "mcfunction_command": "MCFunction 命令",
+        "status_ready": "拖拽数据包到窗口即可开始",
+        "status_parsing": "解析中…",
+        "status_done": "解析完成，共 {} 条可翻译文本",
+        "status_tm_filled": "已从翻译记忆填充 {} 条",
+        "status_carry_dropped": "{} 条译文的原文已改动或已删除，未带回",
+        "tip": "提示",
+        "close_current": "关闭当前文件",
+        "not_opened": "尚未打开任何数据包",
+        "S_Closed": "已关闭数据包",
+        "recent_files": "最近打开",
+        "empty": "无",
+        "file_no_longer_exists\n{}": "文件不存在\n{}",
+        "save_ok": "已保存为\n{}",
+        "btn_cancel_save": "取消保存",
+        "status_saving": "正在保存…",
+        "status_save_cancelled": "已取消保存",
+        "save_fail": "保存失败\n{}",
+        "about_text": "MC 数据包翻译工具\n支持全版本 Java 版数据包\n作者：Ace"
+    },
+    "en_US": {
+        "app_title": "MC Datapack Translator Tool",
+        "lang_name": "English",
+        "menu_file": "File",
+        "menu_open": "Open Datapack",
+        "menu_open_dir": "Open Datapack Folder",
+        "menu_open_project": "Open Project",
+        "menu_save_project": "Save Project",
+        "menu_export": "Export Translations",
+        "menu_import": "Import Translations",
+        "export_done": "Exported {} entries to {}",
+        "import_done": "Imported {} translations",
+        "import_report": "Imported {}, {} already identical\n{} keys no longer in the datapack\n{} skipped because the source text changed\n{} mcfunction keys skipped because lang JSON has no source text to check\n{}",
+        "exchange_fail": "Export / import failed\n{}",
+        "project_saved": "Project saved to {}",
+        "project_fail": "Project file error\n{}",
+        "status_source_changed": "Files changed, re-parsing…",
+        "menu_exit": "Exit",
+        "menu_edit": "Edit",
+        "menu_settings": "Settings",
+        "menu_help": "Help",
+        "menu_about": "About",
+        "menu_diagnostics": "Diagnostics",
+        "setting_diagnostics": "Record performance diagnostics (phase timings and counters)",
+        "diag_profile": "cProfile next parse / save",
+        "diag_memory": "tracemalloc next parse / save",
+        "diag_refresh": "Refresh",
+        "diag_reset": "Reset",
+        "diag_export": "Export JSON",
+        "diag_disabled": "Diagnostics are off: enable them in Settings, or start with MCDT_DIAG=1",
+        "col_file": "File",
+        "col_path": "Path/Line",
+        "col_source": "Original text",
+        "col_trans": "Translation",
+        "setting_show_vanilla": "Show vanilla namespace (minecraft:)",
+        "setting_ns_include": "Only parse these namespaces (comma separated, empty = all)",
+        "setting_ns_exclude": "Skip these namespaces (comma separated)",
+        "setting_compress_level": "Output compression level",
+        "compress_default": "Default",
+        "compress_store": "Store only (fastest)",
+        "setting_lang": "Language",
+        "btn_load": "Load Datapack",
+        "btn_save": "Save Translation",
+        "btn_theme": "Toggle Theme",
+        "group_by_source": "Group by source",
+        "search_placeholder": "Filter: source / translation, file:prefix path:prefix",
+        "filter_untranslated": "Untranslated only",
+        "filter_all_ns": "All namespaces",
+        "json_field": "JSON Fields",
+        "mcfunction_command": "MCFunction Commands",
+        "status_ready": "Drag datapack into window to start",
+        "status_parsing": "Parsing…",
+        "status_done": "Done, {} entries found",
+        "status_tm_filled": "{} filled from translation memory",
+        "status_carry_dropped": "{} translations not carried over (source changed or removed)",
+        "tip": "Tip",
+        "close_current": "Close File",
+        "not_opened": "No datapack opened",
+        "S_Closed": "Datapack closed",
+        "recent_files": "Recent Files",
+        "empty": "Empty",
+        "file_no_longer_exists\n{}": "File no longer exists:\n{}",
+        "save_ok": "Saved to\n{}",
+        "btn_cancel_save": "Cancel Save",
+        "status_saving": "Saving...",
+        "status_save_cancelled": "Save cancelled",
+        "save_fail": "Save failed\n{}",
+        "about_text": "MC Datapack Translator Tool\nSupports all Java Edition datapacks\nAuthor: Ace"
+    },
+}
+
 class Translator:
+    """界面文字：第一次用到某种语言时才读取 langs/<lang>.json，与内置表合并后缓存，切换语言不再重复读文件"""
+    _tables: Dict[str, dict] = {}
     def __init__(self, lang: str = DEFAULT_LANG):
         self.lang = lang
-        self._data = {}
-        self.load(lang)
+        self._data = None
     def load(self, lang: str):
-        file = LANG_PATH / f"{lang}.json"
-        if file.exists():
-            self._data = json.loads(file.read_text(encoding="utf-8"))
+        self.lang = lang
+        self._data = None
+    @classmethod
+    def table(cls, lang: str) -> dict:
+        data = cls._tables.get(lang)
+        if data is None:
+            data = dict(BUILTIN_LANGS.get(lang, {}))
+            file = get_lang_dir() / f"{lang}.json"
+            try:
+                data.update(json.loads(file.read_text(encoding="utf-8")))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print("Lang load fail:", file, e)
+            cls._tables[lang] = data
+        return data
+    @staticmethod
+    def languages() -> List[str]:
+        return sorted(set(BUILTIN_LANGS) | {f.stem for f in get_lang_dir().glob("*.json")})
     def tr(self, key: str, **kwargs) -> str:
+        if self._data is None:
+            self._data = self.table(self.lang)
         txt = self._data.get(key, key)
         if kwargs:
             txt = txt.format(**kwargs)
@@ -86,235 +231,248 @@ class Translator:
 translator = Translator(DEFAULT_LANG)
 tr = translator.tr
 
-# -------------------- 数据 --------------------
-class Entry:
-    def __init__(self, file: str, text: str, path: str, cmd: str = None):
-        self.file = file
-        self.text = text
-        self.path = path
-        self.cmd = cmd
-        self.translated = ""
-    def key(self):
-        return (self.file, self.path)
-
-JSON_FIELDS = ["title", "description", "displayName", "text", "subtitle", "name"]
-COMMAND_FIELDS = {
-    "tellraw": ["text"],
-    "title": ["title", "subtitle", "actionbar"],
-    "bossbar": ["name"],
-    "team": ["displayName", "prefix", "suffix"],
-    "scoreboard": ["objective.displayName"],
-    "item": ["Name", "Lore[]"],
-    "execute": ["run.title", "run.tellraw", "run.bossbar", "run.team", "run.scoreboard", "run.item"],
-}
-COMMAND_TYPES = list(COMMAND_FIELDS.keys())
-
-# -------------------- JSON 抽取 --------------------
-def extract_json_entries(z: zipfile.ZipFile, name: str, wanted: set) -> List[Entry]:
-    entries = []
-    def walk(node, path=""):
-        if isinstance(node, dict):
-            for k, v in node.items():
-                if k in wanted:
-                    if isinstance(v, str):
-                        entries.append(Entry(name, v, f"{path}.{k}" if path else k))
-                    elif isinstance(v, list) and all(isinstance(i, str) for i in v):
-                        for idx, s in enumerate(v):
-                            entries.append(Entry(name, s, f"{path}.{k}[{idx}]" if path else f"{k}[{idx}]"))
-                    else:
-                        walk(v, f"{path}.{k}" if path else k)
-                else:
-                    walk(v, f"{path}.{k}" if path else k)
-        elif isinstance(node, list):
-            for idx, item in enumerate(node):
-                walk(item, f"{path}[{idx}]" if path else f"[{idx}]")
-    try:
-        data = json.loads(z.read(name).decode("utf-8"))
-        walk(data)
-    except Exception as e:
-        print("JSON fail:", name, e)
-    return entries
-
-# -------------------- mcfunction 抽取 --------------------
-RE_CMD = re.compile(r"^((execute )?)(tellraw|title|bossbar|team|scoreboard|item)\b(.*)", re.IGNORECASE)
-
-def extract_outer_json(s: str) -> str:
-    start = s.find("{")
-    if start == -1: return ""
-    stack = []
-    for i in range(start, len(s)):
-        if s[i] == "{":
-            stack.append("{")
-        elif s[i] == "}":
-            if stack:
-                stack.pop()
-                if not stack:
-                    return s[start:i+1]
-    return ""
-
-def parse_mcfunction(z: zipfile.ZipFile, name: str, wanted: set) -> List[Entry]:
-    entries = []
-    try:
-        content = z.read(name).decode("utf-8")
-    except: return entries
-    for lineno, rawline in enumerate(content.splitlines(), 1):
-        line = rawline.strip()
-        if not line or line.startswith("#"): continue
-        m = RE_CMD.match(line)
-        if not m: continue
-        base = m.group(3)
-        if base not in wanted: continue
-        args = m.group(4).strip()
-        json_str = extract_outer_json(args)
-        if not json_str: continue
-        try:
-            obj = json.loads(json_str)
-        except: continue
-
-        if isinstance(obj, str) and base in COMMAND_FIELDS:
-            field = COMMAND_FIELDS.get(base, base)
-            print("【DEBUG】字段映射 -> field=", field)
-            entries.append(Entry(name, obj, f"line{lineno}.{field}", base))
-        def walk(node, p=""):
-            if isinstance(node, dict):
-                for k, v in node.items():
-                    if k == "run" and isinstance(v, dict):
-                        walk(v, f"{p}.run" if p else "run")
-                        continue
-                    if k in ("text", "title", "subtitle", "actionbar", "Name") and isinstance(v, str):
-                        entries.append(Entry(name, v, f"line{lineno}{p}.{k}", base))
-                    elif k == "Lore" and isinstance(v, list):
-                        for idx, lore in enumerate(v):
-                            if isinstance(lore, str):
-                                entries.append(Entry(name, lore, f"line{lineno}{p}.{k}[{idx}]", base))
-                    elif isinstance(v, (dict, list)):
-                        walk(v, f"{p}.{k}" if p else k)
-            elif isinstance(node, list):
-                for idx, item in enumerate(node):
-                    walk(item, f"{p}[{idx}]" if p else f"[{idx}]")
-        walk(obj)
-    return entries
-
-# -------------------- 回写 --------------------
-def build_translated_zip(zin: zipfile.ZipFile, entries: List[Entry], out: str):
-    mapping = {e.key(): e for e in entries if e.translated}
-    print("【DEBUG】待写入映射条数 =", len(mapping))
-    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zout:
-        for info in zin.infolist():
-            data = zin.read(info)
-            if info.filename.endswith(".json") and any(e.file == info.filename for e in entries):
-                try:
-                    obj = json.loads(data.decode("utf-8"))
-                    apply_json_translation(obj, mapping, info.filename)
-                    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
-                except: pass
-            elif info.filename.endswith(".mcfunction") and any(e.file == info.filename for e in entries):
-                data = apply_mcfunction_translation(data.decode("utf-8"), mapping, info.filename).encode("utf-8")
-            zout.writestr(info, data)
-
-def apply_json_translation(obj, mapping, fname):
-    def walk(node, path=""):
-        if isinstance(node, dict):
-            for k, v in node.items():
-                if k in JSON_FIELDS:
-                    if isinstance(v, str):
-                        map_path = f"{path}.{k}" if path else k
-                        ent = mapping.get((fname, map_path))
-                        if ent:
-                            node[k] = ent.translated
-                    elif isinstance(v, list) and all(isinstance(i, str) for i in v):
-                        for idx, s in enumerate(v):
-                            map_path = f"{path}.{k}[{idx}]" if path else f"{k}[{idx}]"
-                            ent = mapping.get((fname, map_path))
-                            if ent:
-                                v[idx] = ent.translated
-                    else:
-                        walk(v, f"{path}.{k}" if path else k)
-                else:
-                    walk(v, f"{path}.{k}" if path else k)
-        elif isinstance(node, list):
-            for idx, item in enumerate(node):
-                walk(item, f"{path}[{idx}]" if path else f"[{idx}]")
-    walk(obj)
-    
-def apply_mcfunction_translation(content: str, mapping, fname):
-    lines = content.splitlines()
-    entries = [e for e in mapping.values() if e.file == fname and e.translated]
-    for e in entries:
-        m = re.search(r"line(\d+)", e.path)
-        if not m: continue
-        lineno = int(m.group(1)) - 1
-        if not (0 <= lineno < len(lines)): continue
-        line = lines[lineno]
-        old_json = extract_outer_json(line)
-        if not old_json: continue
-        try:
-            obj = json.loads(old_json)
-        except: continue
-
-        # ---------- 通用字段回写 ----------
-        def set_nested(node, path_parts, new_val):
-            cur = node
-            for part in path_parts[:-1]:
-                if isinstance(cur, dict) and part in cur:
-                    cur = cur[part]
-                elif isinstance(cur, list) and part.isdigit():
-                    cur = cur[int(part)]
-                else:
-                    return
-            last = path_parts[-1]
-            if isinstance(cur, dict) and last in cur and isinstance(cur[last], str):
-                cur[last] = new_val
-            elif isinstance(cur, list) and last.isdigit() and isinstance(cur[int(last)], str):
-                cur[int(last)] = new_val
-
-        path_suffix = e.path.split(".", 1)[1] if "." in e.path else ""
-        path_parts = path_suffix.split(".")
-
-        m_idx = re.search(r"\[(\d+)\]\.text", e.path)
-        if m_idx:
-            idx = int(m_idx.group(1))
-            if isinstance(obj, list) and 0 <= idx < len(obj) and obj[idx].get("text") == e.text:
-                obj[idx]["text"] = e.translated
-                new_json = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
-                lines[lineno] = line.replace(old_json, new_json)
-                continue
-
-        if path_parts and path_parts[-1] in ("text", "title", "subtitle", "actionbar"):
-            set_nested(obj, path_parts, e.translated)
-            new_json = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
-            lines[lineno] = line.replace(old_json, new_json)
-
-    return "\n".join(lines)
+class ParseWorker(QThread):
+    """始终按全部 JSON 字段与命令类型抽取，设置里的勾选只在表格上做筛选
 
+    信号都带上发起时的代号 gen，主窗口据此丢弃已被新解析取代的结果；
+    requestInterruption() 后在下一个成员边界停下，不再发出 parsed
+    """
+    batch = pyqtSignal(int, list, int, int)   # 代号, [(成员名, 记录)], 已完成成员数, 成员总数
+    parsed = pyqtSignal(int)
+    def __init__(self, zpath, gen=0, workers=None, cache_dir=None, member_filter=None, capture=(False, False)):
+        super().__init__()
+        self.zpath = zpath
+        self.gen = gen
+        self.member_filter = member_filter
+        self.jf = set(JSON_FIELDS)
+        self.cf = set(COMMAND_TYPES)
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.capture = capture   # (cProfile, tracemalloc)
+    def run(self):
+        with DIAG.capture(get_diag_dir(), "parse", *self.capture), DIAG.phase("parse.total"):
+            cache = ParseCache(self.cache_dir, self.zpath, self.jf, self.cf) if self.cache_dir else None
+            for members, done, total in iter_entry_batches(self.zpath, self.jf, self.cf, self.workers,
+                                                           cache=cache, member_filter=self.member_filter,
+                                                           cancelled=self.isInterruptionRequested):
+                self.batch.emit(self.gen, members, done, total)
+        if not self.isInterruptionRequested():
+            self.parsed.emit(self.gen)
 
-class ParseWorker(QThread):
-    parsed = pyqtSignal(list)
-    def __init__(self, zpath, jf, cf):
+class SaveWorker(QThread):
+    """在后台写出译文包（zip 或目录，按 out 判断）；store 应为快照，保存期间界面可以继续编辑，requestInterruption() 取消"""
+    progress = pyqtSignal(int, int)   # 已写成员数, 成员总数
+    saved = pyqtSignal(bool)          # True 完成，False 已取消
+    failed = pyqtSignal(str)
+    def __init__(self, zpath, store: EntryStore, out, index, level=None, capture=(False, False)):
         super().__init__()
         self.zpath = zpath
-        self.jf = jf
-        self.cf = cf
+        self.store = store
+        self.out = out
+        self.index = index
+        self.level = level
+        self.capture = capture   # (cProfile, tracemalloc)
+    def run(self):
+        try:
+            with DIAG.capture(get_diag_dir(), "save", *self.capture), DIAG.phase("save.total"), \
+                    open_source(self.zpath) as src:
+                steps = iter_translated(src, self.store, self.out, self.index, self.level)
+                for done, total in steps:
+                    if self.isInterruptionRequested():
+                        steps.close()
+                        self.saved.emit(False)
+                        return
+                    self.progress.emit(done, total)
+        except Exception as e:
+            print("save fail:", e)
+            self.failed.emit(str(e))
+            return
+        self.saved.emit(True)
+
+class FuzzyIndexWorker(QThread):
+    """在后台建立翻译记忆的近似匹配索引"""
+    ready = pyqtSignal()
+    def __init__(self, memory: TranslationMemory):
+        super().__init__()
+        self.memory = memory
     def run(self):
-        entries = []
-        with zipfile.ZipFile(self.zpath, "r") as z:
-            for name in z.namelist():
-                if name.endswith(".json"):
-                    entries.extend(extract_json_entries(z, name, self.jf))
-                elif name.endswith(".mcfunction"):
-                    entries.extend(parse_mcfunction(z, name, self.cf))
-        self.parsed.emit(entries)
+        self.memory.fuzzy()
+        self.ready.emit()
+
+class SearchIndexWorker(QThread):
+    """在后台建立筛选栏的索引，完成后发出该索引，由界面线程调用 finish()"""
+    ready = pyqtSignal(object)
+    def __init__(self, index: SearchIndex):
+        super().__init__()
+        self.index = index
+    def run(self):
+        with DIAG.phase("search.build"):
+            self.index.build()
+        self.ready.emit(self.index)
+
+# -------------------- 表格模型 --------------------
+class EntryTableModel(QAbstractTableModel):
+    """直接读取 EntryStore 的表格模型，只为可见行生成数据
+
+    rows 保存当前筛选下可见的存储行号，select(start) 返回 start 之后新增行中可见的部分
+    """
+    COLUMNS = ("file", "path", "text", "translated")
+    COL_TRANS = 3
+    def __init__(self, select, parent=None):
+        super().__init__(parent)
+        self.select = select
+        self.entries = EntryStore()
+        self.rows = array("I")
+        self.headers = [""] * len(self.COLUMNS)
+    def set_entries(self, entries: EntryStore):
+        self.beginResetModel()
+        self.entries = entries
+        self.rows = self.select(0)
+        self.endResetModel()
+    def refilter(self):
+        self.beginResetModel()
+        self.rows = self.select(0)
+        self.endResetModel()
+    def set_rows(self, rows: array):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+    def append(self, members: list):
+        """追加一批 [(成员名, 记录)]，只为可见的新行发插入通知"""
+        start = len(self.entries)
+        for name, rows in members:
+            self.entries.add(name, rows)
+        new = self.select(start)
+        if not new:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+        self.rows.extend(new)
+        self.endInsertRows()
+    def set_headers(self, headers: List[str]):
+        self.headers = list(headers)
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, len(self.headers) - 1)
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return getattr(self.entries[self.rows[index.row()]], self.COLUMNS[index.column()])
+        return None
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == self.COL_TRANS:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != self.COL_TRANS:
+            return False
+        self.entries[self.rows[index.row()]].translated = str(value).strip()
+        self.dataChanged.emit(index, index)
+        return True
+
+class GroupTreeModel(QAbstractItemModel):
+    """按原文分组的树：顶层一行对应一个原文，子行是它出现的各个位置
+
+    顶层的译文改动会写到组内每一条，子行可以单独改某一处；internalId 为 0 表示顶层，
+    否则为所属组号 + 1
+    """
+    COLUMNS = EntryTableModel.COLUMNS
+    COL_TRANS = EntryTableModel.COL_TRANS
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = EntryStore()
+        self.groups: List[array] = []
+        self.headers = [""] * len(self.COLUMNS)
+    def set_groups(self, entries: EntryStore, rows):
+        self.beginResetModel()
+        self.entries = entries
+        self.groups = entries.group_by_text(rows)
+        self.endResetModel()
+    def set_headers(self, headers: List[str]):
+        self.headers = list(headers)
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, len(self.headers) - 1)
+    def store_row(self, index) -> int:
+        if index.internalId():
+            return self.groups[index.internalId() - 1][index.row()]
+        return self.groups[index.row()][0]
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column, parent.row() + 1 if parent.isValid() else 0)
+    def parent(self, index=None):
+        if index is None:
+            return super().parent()
+        if not index.isValid() or not index.internalId():
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.groups)
+        if parent.internalId() or parent.column() != 0:
+            return 0
+        group = self.groups[parent.row()]
+        return len(group) if len(group) > 1 else 0
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+        col = self.COLUMNS[index.column()]
+        e = self.entries[self.store_row(index)]
+        if index.internalId():
+            return "" if col == "text" else getattr(e, col)
+        size = len(self.groups[index.row()])
+        if size > 1 and col == "file":
+            return f"×{size}"
+        if size > 1 and col == "path":
+            return ""
+        return getattr(e, col)
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == self.COL_TRANS:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != self.COL_TRANS:
+            return False
+        value = str(value).strip()
+        if index.internalId():
+            self.entries[self.store_row(index)].translated = value
+            self.dataChanged.emit(index, index)
+            return True
+        group = self.groups[index.row()]
+        translations = self.entries.translations
+        for row in group:
+            if value:
+                translations[row] = value
+            else:
+                translations.pop(row, None)
+        self.dataChanged.emit(index, index)
+        if len(group) > 1:
+            self.dataChanged.emit(self.index(0, self.COL_TRANS, index),
+                                  self.index(len(group) - 1, self.COL_TRANS, index))
+        return True
 
 # -------------------- 设置 --------------------
 class SettingsDialog(QDialog):
+    COMPRESS_LEVELS = (None, 0, 1, 3, 6, 9)
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle(tr("menu_settings"))
-        self.setFixedSize(800, 380)
+        self.setFixedSize(800, 500)
         self.lang_name_map = {"zh_CN": "中文", "en_US": "English"}
         self.cmb_lang = ComboBox()
-        self.lang_map = {f.stem: f for f in LANG_PATH.glob("*.json")}
-        for k in self.lang_map.keys():
+        for k in Translator.languages():
             self.cmb_lang.addItem(self.lang_name_map.get(k, k), k)
         self.cmb_lang.setCurrentText(self.lang_name_map.get(parent.cur_lang, parent.cur_lang))
         self.chk_vanilla = CheckBox(tr("setting_show_vanilla"))
@@ -325,6 +483,20 @@ class SettingsDialog(QDialog):
         self.cmd_checks = {c: CheckBox(c) for c in COMMAND_TYPES}
         for c in COMMAND_TYPES:
             self.cmd_checks[c].setChecked(c in parent.cmd_types)
+        self.ns_include = LineEdit()
+        self.ns_include.setText(", ".join(parent.ns_include))
+        self.ns_include.setPlaceholderText("ns1, ns2")
+        self.ns_exclude = LineEdit()
+        self.ns_exclude.setText(", ".join(parent.ns_exclude))
+        self.ns_exclude.setPlaceholderText("ns1, ns2")
+        self.cmb_level = ComboBox()
+        for level in self.COMPRESS_LEVELS:
+            name = {None: tr("compress_default"), 0: tr("compress_store")}.get(level, str(level))
+            self.cmb_level.addItem(name, userData=level)
+        self.cmb_level.setCurrentIndex(self.COMPRESS_LEVELS.index(parent.compress_level))
+        self.chk_diag = CheckBox(tr("setting_diagnostics"))
+        self.chk_diag.setChecked(DIAG.enabled)
+        self.chk_diag.setEnabled(not os.environ.get(ENV_VAR))   # 环境变量开启时以它为准
         btn = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         btn.accepted.connect(self.accept)
         btn.rejected.connect(self.reject)
@@ -342,14 +514,72 @@ class SettingsDialog(QDialog):
         for chk in self.cmd_checks.values():
             cmd_grid.addWidget(chk)
         v.addLayout(cmd_grid)
+        v.addWidget(SubtitleLabel(tr("setting_ns_include")))
+        v.addWidget(self.ns_include)
+        v.addWidget(SubtitleLabel(tr("setting_ns_exclude")))
+        v.addWidget(self.ns_exclude)
+        v.addWidget(SubtitleLabel(tr("setting_compress_level")))
+        v.addWidget(self.cmb_level)
+        v.addWidget(self.chk_diag)
         v.addWidget(btn)
     def current_data(self):
         return "zh_CN" if self.cmb_lang.currentText() == "中文" else "en_US"
+    @staticmethod
+    def split_ns(text: str) -> List[str]:
+        return [ns.strip() for ns in text.replace("，", ",").split(",") if ns.strip()]
+
+class DiagnosticsDialog(QDialog):
+    """显示各阶段累计耗时与计数，可清零、导出 JSON，或为下一次解析 / 保存开启 cProfile、tracemalloc 采样"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(tr("menu_diagnostics"))
+        self.resize(760, 520)
+        self.text = PlainTextEdit()
+        self.text.setReadOnly(True)
+        font = self.text.font()
+        font.setFamily("monospace")
+        self.text.setFont(font)
+        self.chk_profile = CheckBox(tr("diag_profile"))
+        self.chk_profile.setChecked(parent.capture_next[0])
+        self.chk_memory = CheckBox(tr("diag_memory"))
+        self.chk_memory.setChecked(parent.capture_next[1])
+        btn_refresh = PushButton(tr("diag_refresh"))
+        btn_refresh.clicked.connect(self.refresh)
+        btn_reset = PushButton(tr("diag_reset"))
+        btn_reset.clicked.connect(self.reset)
+        btn_export = PrimaryPushButton(tr("diag_export"))
+        btn_export.clicked.connect(self.export)
+        row = QHBoxLayout()
+        row.addWidget(self.chk_profile)
+        row.addWidget(self.chk_memory)
+        row.addStretch()
+        row.addWidget(btn_refresh)
+        row.addWidget(btn_reset)
+        row.addWidget(btn_export)
+        v = QVBoxLayout(self)
+        v.addWidget(self.text)
+        v.addLayout(row)
+        self.refresh()
+    def refresh(self):
+        self.text.setPlainText(DIAG.report() if DIAG.enabled else tr("diag_disabled"))
+    def reset(self):
+        DIAG.reset()
+        self.refresh()
+    def export(self):
+        f, _ = QFileDialog.getSaveFileName(self, tr("diag_export"), "diagnostics.json", filter="*.json")
+        if f:
+            try:
+                DIAG.export(f)
+            except Exception as e:
+                print("diag export fail:", e)
+                MessageBox(tr("tip"), str(e), self).exec()
 
 # -------------------- 主窗口 --------------------
 class MainWindow(QMainWindow):
     restartSignal = pyqtSignal()
     RECENT_MAX = 5
+    REPARSE_DELAY_MS = 300
+    AUTOSAVE_MS = 30000
     def __init__(self):
         self.json_fields = set(JSON_FIELDS)
         self.cmd_types = set(COMMAND_TYPES)
@@ -359,20 +589,55 @@ class MainWindow(QMainWindow):
         self.settings = QSettings("Ace", "MCDatapackTranslator")
         self.recent_files = self.settings.value("recent", [], type=list)
         self.cur_lang = self.settings.value("language", DEFAULT_LANG, type=str)
+        translator.load(self.cur_lang)
+        self.dark = self.settings.value("dark_theme", True, type=bool)
+        # 先定主题再建控件：控件创建时即为最终样式，不必建好后再整体重刷一遍样式表
+        setTheme(Theme.DARK if self.dark else Theme.LIGHT)
+        setThemeColor("#0078d4")
         self.setWindowTitle(tr("app_title"))
         self.resize(1200, 800)
         self.setAcceptDrops(True)
         self.show_vanilla = True
-        self.cur_lang = DEFAULT_LANG
-        self.trans = Translator(self.cur_lang)
-        self.table = TableWidget()
-        self.table.setColumnCount(4)
-        self.table.setRowCount(0)
-        self.table.setHorizontalHeaderLabels([tr("col_file"), tr("col_path"), tr("col_source"), tr("col_trans")])
+        self.ns_include = self.settings.value("ns_include", [], type=list)
+        self.ns_exclude = self.settings.value("ns_exclude", [], type=list)
+        level = self.settings.value("compress_level", -1, type=int)
+        self.compress_level = level if level in SettingsDialog.COMPRESS_LEVELS else None
+        DIAG.enabled = DIAG.enabled or self.settings.value("diagnostics", False, type=bool)
+        self.capture_next = (False, False)   # 下一次解析 / 保存是否采集 (cProfile, tracemalloc)
+        self.model = EntryTableModel(self.visible_rows, self)
+        self.model.set_headers([tr("col_file"), tr("col_path"), tr("col_source"), tr("col_trans")])
+        self.table = TableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.setAlternatingRowColors(True)
-        self.table.setEditTriggers(TableWidget.EditTrigger.DoubleClicked)
-        self.table.itemChanged.connect(self.on_cell_change)
+        self.table.setEditTriggers(TableView.EditTrigger.DoubleClicked)
+        self.table.selectionModel().currentRowChanged.connect(self.show_suggestions)
+        self.model.dataChanged.connect(self.on_edited)
+        self.group_model = GroupTreeModel(self)
+        self.group_model.dataChanged.connect(self.on_edited)
+        self.group_model.set_headers([tr("col_file"), tr("col_path"), tr("col_source"), tr("col_trans")])
+        self.entries = EntryStore()
+        self.base_rows = array("I")   # 设置筛选后的行，筛选栏在此基础上再过滤
+        self.search = SearchIndex(self.entries)
+        self.search_worker: SearchIndexWorker = None
+        self.query = Query()
+        self.tree: TreeView = None   # 分组视图第一次勾选时才创建
+        self.views = QStackedWidget()
+        self.views.addWidget(self.table)
+        self.chk_group = CheckBox(tr("group_by_source"))
+        self.chk_group.toggled.connect(self.set_grouped)
+        self.search_edit = SearchLineEdit()   # 筛选栏：每次输入都经索引重新筛选
+        self.search_edit.setPlaceholderText(tr("search_placeholder"))
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.apply_filter)
+        self.chk_untranslated = CheckBox(tr("filter_untranslated"))
+        self.chk_untranslated.toggled.connect(self.apply_filter)
+        self.cmb_ns = ComboBox()
+        self.cmb_ns.addItem(tr("filter_all_ns"), userData=None)
+        self.cmb_ns.currentIndexChanged.connect(self.apply_filter)
+        self.suggestions = ListWidget()
+        self.suggestions.itemDoubleClicked.connect(self.apply_suggestion)
         self.btn_load = PrimaryPushButton(tr("btn_load"))
         self.btn_save = PrimaryPushButton(tr("btn_save"))
         self.btn_theme = PushButton(tr("btn_theme"))
@@ -381,11 +646,22 @@ class MainWindow(QMainWindow):
         top.addWidget(self.btn_load)
         top.addWidget(self.btn_save)
         top.addWidget(self.btn_theme)
+        top.addWidget(self.chk_group)
         top.addStretch()
         top.addWidget(self.status)
+        bar = QHBoxLayout()
+        bar.addWidget(self.search_edit, 1)
+        bar.addWidget(self.cmb_ns)
+        bar.addWidget(self.chk_untranslated)
         right = QVBoxLayout()
         right.addLayout(top)
-        right.addWidget(self.table)
+        right.addLayout(bar)
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.views)
+        splitter.addWidget(self.suggestions)
+        splitter.setStretchFactor(0, 5)
+        splitter.setStretchFactor(1, 1)
+        right.addWidget(splitter)
         central = QWidget()
         central.setLayout(right)
         self.setCentralWidget(central)
@@ -393,13 +669,27 @@ class MainWindow(QMainWindow):
         self.btn_load.clicked.connect(self.load_dp)
         self.btn_save.clicked.connect(self.save_dp)
         self.btn_theme.clicked.connect(self.toggle_theme)
-        self.entries: List[Entry] = []
+        self.index: Dict[str, Dict[str, int]] = {}
+        self.carry: List[tuple] = []
+        self._memory: TranslationMemory = None
+        self.save_worker: SaveWorker = None
+        self.worker: ParseWorker = None
+        self.parse_gen = 0
+        self.retired = set()   # 已取消但线程尚未退出的解析，保留引用直到 finished
+        self.watcher = QFileSystemWatcher(self)   # 打开的是目录时监视其中的文件，改动后增量重新解析
+        self.watcher.fileChanged.connect(self.on_source_changed)
+        self.watcher.directoryChanged.connect(self.on_source_changed)
+        self.reparse_timer = QTimer(self)   # 合并编辑器保存时接连触发的多次通知
+        self.reparse_timer.setSingleShot(True)
+        self.reparse_timer.setInterval(self.REPARSE_DELAY_MS)
+        self.reparse_timer.timeout.connect(self.reparse_changed)
+        self.project: ProjectFile = None   # 保存过或打开的项目文件，定时只追加改动过的译文
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setInterval(self.AUTOSAVE_MS)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start()
         self.zpath = ""
-        self.dark = True
-        self._update_theme_icon() 
-        self.dark = self.settings.value("dark_theme", True, type=bool)   
-        setTheme(Theme.DARK if self.dark else Theme.LIGHT)               
-        setThemeColor("#0078d4")
+        self._update_theme_icon()
 
     def build_menu(self):
         bar = self.menuBar()
@@ -408,6 +698,24 @@ class MainWindow(QMainWindow):
         open_act.setShortcut(QKS("Ctrl+O"))
         open_act.triggered.connect(self.load_dp)
         file_menu.addAction(open_act)
+        open_dir_act = QAction(tr("menu_open_dir"), self)
+        open_dir_act.setShortcut(QKS("Ctrl+Shift+O"))
+        open_dir_act.triggered.connect(self.load_dir)
+        file_menu.addAction(open_dir_act)
+        file_menu.addSeparator()
+        open_proj_act = QAction(tr("menu_open_project"), self)
+        open_proj_act.triggered.connect(self.open_project)
+        file_menu.addAction(open_proj_act)
+        save_proj_act = QAction(tr("menu_save_project"), self)
+        save_proj_act.setShortcut(QKS("Ctrl+S"))
+        save_proj_act.triggered.connect(self.save_project)
+        file_menu.addAction(save_proj_act)
+        export_act = QAction(tr("menu_export"), self)
+        export_act.triggered.connect(self.export_entries)
+        file_menu.addAction(export_act)
+        import_act = QAction(tr("menu_import"), self)
+        import_act.triggered.connect(self.import_entries)
+        file_menu.addAction(import_act)
         self.recent_menu = QMenu(tr("recent_files"), self)
         file_menu.addMenu(self.recent_menu)
         self.update_recent_menu()
@@ -425,6 +733,9 @@ class MainWindow(QMainWindow):
         set_act.triggered.connect(self.open_settings)
         edit_menu.addAction(set_act)
         help_menu = bar.addMenu(tr("menu_help"))
+        diag_act = QAction(tr("menu_diagnostics"), self)
+        diag_act.triggered.connect(self.open_diagnostics)
+        help_menu.addAction(diag_act)
         about_act = QAction(tr("menu_about"), self)
         about_act.triggered.connect(self.about)
         help_menu.addAction(about_act)
@@ -440,9 +751,19 @@ class MainWindow(QMainWindow):
     def open_settings(self):
         dlg = SettingsDialog(self)
         if dlg.exec() == QDialog.DialogCode.Accepted:
+            old_ns = (self.show_vanilla, self.ns_include, self.ns_exclude)
             self.show_vanilla = dlg.chk_vanilla.isChecked()
+            self.ns_include = dlg.split_ns(dlg.ns_include.text())
+            self.ns_exclude = dlg.split_ns(dlg.ns_exclude.text())
+            self.settings.setValue("ns_include", self.ns_include)
+            self.settings.setValue("ns_exclude", self.ns_exclude)
             self.json_fields = {f for f, chk in dlg.json_checks.items() if chk.isChecked()}
             self.cmd_types   = {c for c, chk in dlg.cmd_checks.items() if chk.isChecked()}
+            self.compress_level = dlg.cmb_level.currentData()
+            self.settings.setValue("compress_level", -1 if self.compress_level is None else self.compress_level)
+            if not os.environ.get(ENV_VAR):
+                DIAG.enabled = dlg.chk_diag.isChecked()
+                self.settings.setValue("diagnostics", DIAG.enabled)
 
             new_lang = dlg.current_data()
             if new_lang != self.cur_lang:
@@ -453,8 +774,25 @@ class MainWindow(QMainWindow):
                 self.retranslate_ui()
                 self.settings.setValue("language", self.cur_lang)
 
-            if self.zpath:         
-                self.run_parse()
+            if not self.zpath:
+                return
+            if old_ns != (self.show_vanilla, self.ns_include, self.ns_exclude):
+                # 命名空间在解析前就已过滤，变动后需要重新解析（未变的成员走缓存），已填的译文按 key 带回
+                self.run_parse(keep_translations=True)
+            else:
+                self.model.refilter()
+                self.refresh_groups()
+                self.refresh_namespaces()
+                self.status.setText(tr("status_done").format(self.model.rowCount()))
+
+    def open_diagnostics(self):
+        dlg = DiagnosticsDialog(self)
+        dlg.exec()
+        self.capture_next = (dlg.chk_profile.isChecked(), dlg.chk_memory.isChecked())
+    def take_capture(self):
+        """采样只作用于下一次解析或保存"""
+        capture, self.capture_next = self.capture_next, (False, False)
+        return capture
 
     def retranslate_ui(self):
         self.setWindowTitle(tr("app_title"))
@@ -462,7 +800,12 @@ class MainWindow(QMainWindow):
         self.btn_save.setText(tr("btn_save"))
         self.status.setText(tr("status_ready"))
         self.btn_theme.setText(tr("btn_theme"))
-        self.table.setHorizontalHeaderLabels([tr("col_file"), tr("col_path"), tr("col_source"), tr("col_trans")])
+        self.model.set_headers([tr("col_file"), tr("col_path"), tr("col_source"), tr("col_trans")])
+        self.group_model.set_headers([tr("col_file"), tr("col_path"), tr("col_source"), tr("col_trans")])
+        self.chk_group.setText(tr("group_by_source"))
+        self.search_edit.setPlaceholderText(tr("search_placeholder"))
+        self.chk_untranslated.setText(tr("filter_untranslated"))
+        self.cmb_ns.setItemText(0, tr("filter_all_ns"))
         self.menuBar().clear()
         self.build_menu()
 
@@ -474,7 +817,7 @@ class MainWindow(QMainWindow):
             e.acceptProposedAction()
     def dropEvent(self, e):
         f = e.mimeData().urls()[0].toLocalFile()
-        if f.lower().endswith(".zip"):
+        if f.lower().endswith(".zip") or os.path.isdir(f):
             self.zpath = f
             self.run_parse()
     def load_dp(self):
@@ -482,41 +825,228 @@ class MainWindow(QMainWindow):
         if f:
             self.zpath = f
             self.run_parse()
-    def run_parse(self):
-        jf = self.json_fields
-        cf = self.cmd_types
+    def load_dir(self):
+        d = QFileDialog.getExistingDirectory(self, tr("menu_open_dir"))
+        if d:
+            self.zpath = d
+            self.run_parse()
+    def member_filter(self) -> NamespaceFilter:
+        exclude = set(self.ns_exclude)
+        if not self.show_vanilla:
+            exclude.add("minecraft")
+        return NamespaceFilter(self.ns_include, exclude)
+    @staticmethod
+    def carry_records(store: EntryStore) -> List[tuple]:
+        """store 中已翻译的行，记成 (文件, 路径, 原文, 译文)"""
+        files, paths, texts = store.files, store.paths, store.texts
+        return [(files[store.file_col[r]], paths[store.path_col[r]], texts[r], t) for r, t in store.translations.items()]
+    def run_parse(self, keep_translations=False, carry=None):
+        """carry: 解析完成后填回的 (文件, 路径, 原文, 译文)，按 (文件, 路径) 找行，原文对不上的不填；
+        keep_translations 时取当前表格里的译文"""
         self.status.setText(tr("status_parsing"))
-        self.worker = ParseWorker(self.zpath, jf, cf)
+        self.unwatch_source()
+        if keep_translations:
+            carry = self.carry_records(self.entries)
+        self.carry = carry or []
+        self.entries = EntryStore()
+        self.index = {}
+        self.search = SearchIndex(self.entries)
+        self.model.set_entries(self.entries)
+        self.refresh_groups()
+        self.cancel_parse()
+        self.worker = ParseWorker(self.zpath, self.parse_gen, cache_dir=get_cache_dir(),
+                                  member_filter=self.member_filter(), capture=self.take_capture())
+        self.worker.batch.connect(self.on_batch)
         self.worker.parsed.connect(self.on_parsed)
         self.worker.start()
-    def on_parsed(self, entries: List[Entry]):
-        if not self.show_vanilla:
-            entries = [e for e in entries if not e.file.startswith("minecraft/")]
-        self.entries = entries
-        self.status.setText(tr("status_done").format(len(entries)))
-        self.populate_table()
+    def cancel_parse(self):
+        """作废正在进行的解析：代号加一让它迟到的信号被忽略，并请求线程在成员边界退出"""
+        self.parse_gen += 1
+        old = self.worker
+        if old is not None and old.isRunning():
+            old.requestInterruption()
+            self.retired.add(old)
+            old.finished.connect(lambda: self.retired.discard(old))
+        self.worker = None
+    def visible_rows(self, start: int = 0) -> array:
+        """按设置选出的行记入 base_rows，再经筛选栏过滤"""
+        rows = self.entries.select(self.json_fields, self.cmd_types, start=start)
+        if start:
+            self.base_rows.extend(rows)
+        else:
+            self.base_rows = rows
+        return self.search.filter(rows, self.query)
+    def on_batch(self, gen: int, members: list, done: int, total: int):
+        if gen != self.parse_gen:
+            return
+        with DIAG.phase("table.populate"):
+            self.model.append(members)
+        self.status.setText(f"{tr('status_parsing')} {done}/{total}")
+    def on_parsed(self, gen: int):
+        if gen != self.parse_gen:
+            return
+        with DIAG.phase("index.build"):
+            self.index = index_entries(self.entries)
+        # 路径按行号记，前面插入一行后同一路径就是另一句原文，和导入一样只填原文没变的行
+        carried = merge_translations(self.entries, self.carry, self.index)
+        dropped = len(carried.missing) + len(carried.stale)
+        with DIAG.phase("tm.prefill"):
+            filled = self.memory().prefill(self.entries)
+        with DIAG.phase("table.populate"):
+            if self.carry or filled:
+                self.carry = []
+                self.model.refilter()
+            self.refresh_groups()
+        self.refresh_namespaces()
+        self.build_search()
+        DIAG.count("entries", len(self.entries))
+        status = tr("status_done").format(self.model.rowCount())
+        if filled:
+            status += " · " + tr("status_tm_filled").format(filled)
+        if dropped:
+            status += " · " + tr("status_carry_dropped").format(dropped)
+        self.status.setText(status)
         self.add_recent(self.zpath)
-    def populate_table(self):
-        self.table.setRowCount(len(self.entries))
-        self.table.verticalHeader().setVisible(False)
-        for i, e in enumerate(self.entries):
-            self.table.setItem(i, 0, QTableWidgetItem(e.file))
-            self.table.setItem(i, 1, QTableWidgetItem(e.path))
-            self.table.setItem(i, 2, QTableWidgetItem(e.text))
-            self.table.setItem(i, 3, QTableWidgetItem(""))
-            self.table.item(i, 2).setFlags(Qt.ItemFlag.ItemIsEnabled)
-            self.table.item(i, 0).setFlags(Qt.ItemFlag.ItemIsEnabled)
-            self.table.item(i, 1).setFlags(Qt.ItemFlag.ItemIsEnabled)
-    def on_cell_change(self, item):
-        if item.column() == 3:
-            self.entries[item.row()].translated = item.text().strip()
+        self.watch_source()
+    def watch_source(self):
+        """目录来源：监视所有子目录（增删、改名）和文本成员（原地改写）"""
+        if not os.path.isdir(self.zpath):
+            return
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(self.zpath):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            paths.append(dirpath)
+            paths.extend(os.path.join(dirpath, f) for f in filenames if is_text_member(f))
+        self.watcher.addPaths(paths)
+    def unwatch_source(self):
+        self.reparse_timer.stop()
+        watched = self.watcher.files() + self.watcher.directories()
+        if watched:
+            self.watcher.removePaths(watched)
+    def on_source_changed(self, path: str):
+        self.reparse_timer.start()
+    def reparse_changed(self):
+        """解析缓存按修改时间判断，只有改动过的文件会重新抽取；已有译文按 (文件, 路径) 带回"""
+        if self.save_worker is not None and self.save_worker.isRunning():
+            self.reparse_timer.start()
+            return
+        self.run_parse(keep_translations=True)
+        self.status.setText(tr("status_source_changed"))
+    # -------------------- 筛选栏 --------------------
+    def build_search(self):
+        """解析完成后在后台为当前条目表建索引；上一个还没建完的保留引用直到线程结束"""
+        old = self.search_worker
+        if old is not None and old.isRunning():
+            self.retired.add(old)
+            old.finished.connect(lambda: self.retired.discard(old))
+        self.search_worker = SearchIndexWorker(self.search)
+        self.search_worker.ready.connect(self.on_search_ready)
+        self.search_worker.start()
+    def on_search_ready(self, index: SearchIndex):
+        if index is self.search:
+            index.finish()
+    def on_edited(self, top, bottom):
+        """译文改动只更新索引中的这几行"""
+        for row in range(top.row(), bottom.row() + 1):
+            self.search.update(self.store_row(top.siblingAtRow(row)))
+    def apply_filter(self, *_):
+        self.query = Query(self.search_edit.text(), self.chk_untranslated.isChecked(), self.cmb_ns.currentData())
+        with DIAG.phase("search.filter"):
+            self.model.set_rows(self.search.filter(self.base_rows, self.query))
+            self.refresh_groups()
+        self.suggestions.clear()
+    def refresh_namespaces(self):
+        """命名空间下拉框：按设置筛选后的各命名空间条目数；原先选中的命名空间仍在时保持选中"""
+        current = self.cmb_ns.currentData()
+        self.cmb_ns.blockSignals(True)
+        self.cmb_ns.clear()
+        self.cmb_ns.addItem(tr("filter_all_ns"), userData=None)
+        for ns, count in self.search.namespaces(self.base_rows):
+            self.cmb_ns.addItem(f"{ns} ({count})", userData=ns)
+        i = self.cmb_ns.findData(current)
+        self.cmb_ns.setCurrentIndex(i if i >= 0 else 0)
+        self.cmb_ns.blockSignals(False)
+        if current is not None and i < 0:
+            self.apply_filter()
+
+    def memory(self) -> TranslationMemory:
+        if self._memory is None:
+            self._memory = TranslationMemory(get_config_dir() / "memory.jsonl")
+            self.fuzzy_worker = FuzzyIndexWorker(self._memory)
+            self.fuzzy_worker.start()
+        return self._memory
+    def set_grouped(self, on: bool):
+        if on:
+            self.refresh_groups()
+            self.views.setCurrentWidget(self.group_view())
+        else:
+            self.model.refilter()
+            self.views.setCurrentWidget(self.table)
+        self.suggestions.clear()
+    def refresh_groups(self):
+        if self.chk_group.isChecked():
+            self.group_model.set_groups(self.entries, self.model.rows)
+    def group_view(self) -> TreeView:
+        if self.tree is None:
+            self.tree = TreeView()
+            self.tree.setModel(self.group_model)
+            self.tree.setEditTriggers(TreeView.EditTrigger.DoubleClicked)
+            self.tree.selectionModel().currentRowChanged.connect(self.show_suggestions)
+            self.views.addWidget(self.tree)
+        return self.tree
+    def current_view(self):
+        return self.tree if self.chk_group.isChecked() else self.table
+    def store_row(self, index) -> int:
+        if index.model() is self.group_model:
+            return self.group_model.store_row(index)
+        return self.model.rows[index.row()]
+    def show_suggestions(self, current, previous=None):
+        """当前行的近似匹配建议，只在选中行变化时查询一次"""
+        self.suggestions.clear()
+        if not current.isValid() or self._memory is None or not self._memory.fuzzy_ready:
+            return
+        text = self.entries.texts[self.store_row(current)]
+        for score, source, translated in self._memory.suggest(text):
+            item = QListWidgetItem(f"{score:.0%}  {source}  →  {translated}")
+            item.setData(Qt.ItemDataRole.UserRole, translated)
+            self.suggestions.addItem(item)
+    def apply_suggestion(self, item):
+        cur = self.current_view().currentIndex()
+        if cur.isValid():
+            cur.model().setData(cur.siblingAtColumn(EntryTableModel.COL_TRANS),
+                                item.data(Qt.ItemDataRole.UserRole))
     def save_dp(self):
+        if self.save_worker is not None and self.save_worker.isRunning():
+            self.save_worker.requestInterruption()
+            return
         if not self.zpath or not self.entries:
             return
-        out = self.zpath.replace(".zip", "_translated.zip")
-        with zipfile.ZipFile(self.zpath, "r") as zin:
-            build_translated_zip(zin, self.entries, out)
-        MessageBox("Done", tr("save_ok").format(out), self).exec()
+        out = default_output(self.zpath)
+        # 解析完成（on_parsed）之前 self.index 还是空的，传 None 让回写按快照重建，否则边解析边改的译文会全部丢掉
+        self.save_worker = SaveWorker(self.zpath, self.entries.snapshot(), out, self.index or None,
+                                      self.compress_level, self.take_capture())
+        self.save_worker.progress.connect(self.on_save_progress)
+        self.save_worker.saved.connect(self.on_saved)
+        self.save_worker.failed.connect(self.on_save_failed)
+        self.btn_save.setText(tr("btn_cancel_save"))
+        self.status.setText(tr("status_saving"))
+        self.save_worker.start()
+    def on_save_progress(self, done: int, total: int):
+        self.status.setText(f"{tr('status_saving')} {done}/{total}")
+    def on_saved(self, ok: bool):
+        self.btn_save.setText(tr("btn_save"))
+        if not ok:
+            self.status.setText(tr("status_save_cancelled"))
+            return
+        worker = self.save_worker
+        store = worker.store
+        self.memory().update((store.texts[r], t) for r, t in store.translations.items())
+        self.status.setText(tr("save_ok").format(worker.out).replace("\n", " "))
+        MessageBox("Done", tr("save_ok").format(worker.out), self).exec()
+    def on_save_failed(self, msg: str):
+        self.btn_save.setText(tr("btn_save"))
+        self.status.setText(tr("status_ready"))
+        MessageBox(tr("tip"), tr("save_fail").format(msg), self).exec()
     def toggle_theme(self):
         self.dark = not self.dark
         setTheme(Theme.DARK if self.dark else Theme.LIGHT)
@@ -554,89 +1084,132 @@ class MainWindow(QMainWindow):
         if not self.zpath:
             MessageBox(self, tr("tip"), tr("not_opened"), self).exec()
             return
-        self.table.setRowCount(0)
-        self.entries.clear()
+        self.autosave()
+        self.project = None
+        self.cancel_parse()
+        self.unwatch_source()
+        self.entries = EntryStore()
+        self.index = {}
+        self.search = SearchIndex(self.entries)
+        self.model.set_entries(self.entries)
+        self.refresh_groups()
+        self.refresh_namespaces()
         self.zpath = ""
         self.status.setText(tr("S_Closed"))
 
+    def filter_spec(self) -> list:
+        """记在项目文件里的命名空间过滤，与 member_filter() 一致"""
+        f = self.member_filter()
+        return [sorted(f.include), sorted(f.exclude)]
+    def parse_finished(self) -> bool:
+        return bool(self.zpath) and (self.worker is None or self.worker.isFinished()) and not self.carry
+    def save_project(self):
+        if not self.parse_finished() or not self.entries:
+            return
+        if self.project is None:
+            base = self.zpath[:-4] if self.zpath.lower().endswith(".zip") else os.path.normpath(self.zpath)
+            f, _ = QFileDialog.getSaveFileName(self, tr("menu_save_project"), base + PROJECT_EXT,
+                                               filter=f"*{PROJECT_EXT}")
+            if not f:
+                return
+            self.project = ProjectFile(f)
+        try:
+            self.project.save(self.zpath, self.entries, self.filter_spec())
+        except Exception as e:
+            print("project save fail:", e)
+            MessageBox(tr("tip"), tr("project_fail").format(e), self).exec()
+            return
+        self.status.setText(tr("project_saved").format(self.project.path))
+    EXCHANGE_FILTER = "CSV (*.csv);;XLIFF (*.xlf *.xliff);;Lang JSON (*.json)"
+    def export_entries(self):
+        """导出当前表格中（经设置与筛选栏过滤后）的行"""
+        if not self.parse_finished() or not self.entries:
+            MessageBox(tr("tip"), tr("not_opened"), self).exec()
+            return
+        base = self.zpath[:-4] if self.zpath.lower().endswith(".zip") else os.path.normpath(self.zpath)
+        f, _ = QFileDialog.getSaveFileName(self, tr("menu_export"), base + ".csv", filter=self.EXCHANGE_FILTER)
+        if not f:
+            return
+        try:
+            with DIAG.phase("exchange.export"):
+                n = export_translations(f, self.entries, self.model.rows)
+        except Exception as e:
+            print("export fail:", e)
+            MessageBox(tr("tip"), tr("exchange_fail").format(e), self).exec()
+            return
+        self.status.setText(tr("export_done").format(n, f))
+    def import_entries(self):
+        """按 (文件, 路径) 合并外部工具改过的译文；有失配的键时列出前几条"""
+        if not self.parse_finished() or not self.entries:
+            MessageBox(tr("tip"), tr("not_opened"), self).exec()
+            return
+        f, _ = QFileDialog.getOpenFileName(self, tr("menu_import"), filter=self.EXCHANGE_FILTER)
+        if not f:
+            return
+        try:
+            with DIAG.phase("exchange.import"):
+                report = import_translations(f, self.entries, self.index)
+        except Exception as e:
+            print("import fail:", e)
+            MessageBox(tr("tip"), tr("exchange_fail").format(e), self).exec()
+            return
+        for row in report.applied:
+            self.search.update(row)
+        self.apply_filter()
+        self.status.setText(tr("import_done").format(len(report.applied)))
+        if report.missing or report.stale or report.unverified:
+            mismatched = report.missing + report.stale + report.unverified
+            sample = "\n".join(f"{file}  {path}" for file, path in mismatched[:10])
+            MessageBox(tr("tip"), tr("import_report").format(len(report.applied), report.unchanged,
+                                                           len(report.missing), len(report.stale),
+                                                           len(report.unverified), sample), self).exec()
+    def autosave(self):
+        """只追加上次写入后改动过的译文；解析进行中或换了数据包时跳过，之后再保存"""
+        if self.project is None or not self.parse_finished():
+            return
+        try:
+            self.project.sync(self.zpath, self.entries, self.filter_spec())
+        except Exception as e:
+            print("project autosave fail:", e)
+    def open_project(self):
+        f, _ = QFileDialog.getOpenFileName(self, tr("menu_open_project"), filter=f"*{PROJECT_EXT}")
+        if f:
+            self.load_project(f)
+    def load_project(self, path):
+        """数据包未改动且过滤设置相同时直接还原条目表，不再解析；否则重新解析，只给原文没变的行带回译文"""
+        try:
+            proj = ProjectFile.load(path)
+        except Exception as e:
+            print("project load fail:", e)
+            MessageBox(tr("tip"), tr("project_fail").format(e), self).exec()
+            return
+        if not os.path.exists(proj.pack):
+            MessageBox(self, tr("tip"), tr("file_no_longer_exists\n{}").format(proj.pack), self).exec()
+            return
+        self.autosave()
+        self.project = proj
+        self.zpath = proj.pack
+        store = proj.store
+        if proj.filter == self.filter_spec() and proj.matches():
+            self.cancel_parse()
+            self.unwatch_source()
+            self.carry = []
+            self.entries = store
+            self.search = SearchIndex(self.entries)
+            self.model.set_entries(self.entries)
+            self.on_parsed(self.parse_gen)
+            return
+        self.run_parse(carry=self.carry_records(store))
+
+    def closeEvent(self, e):
+        self.autosave()
+        super().closeEvent(e)
+
 # -------------------- 启动入口 --------------------
 if __name__ == "__main__":
-    LANG_PATH.mkdir(parents=True, exist_ok=True)
-    # 生成默认语言文件
-    for lang, data in [("zh_CN", {
-        "app_title": "MC 数据包翻译工具",
-        "lang_name": "中文",
-        "menu_file": "文件",
-        "menu_open": "打开数据包",
-        "menu_exit": "退出",
-        "menu_edit": "编辑",
-        "menu_settings": "设置",
-        "menu_help": "帮助",
-        "menu_about": "关于",
-        "col_file": "文件",
-        "col_path": "路径/行号",
-        "col_source": "原文",
-        "col_trans": "译文",
-        "setting_show_vanilla": "显示原版命名空间(minecraft:)",
-        "setting_lang": "界面语言",
-        "btn_load": "加载数据包",
-        "btn_save": "保存翻译",
-        "btn_theme": "切换主题",
-        "json_field": "JSON 字段",
-        "mcfunction_command": "MCFunction 命令",
-        "status_ready": "拖拽数据包到窗口即可开始",
-        "status_parsing": "解析中…",
-        "status_done": "解析完成，共 {} 条可翻译文本",
-        "tip": "提示",
-        "close_current": "关闭当前文件",
-        "not_opened": "尚未打开任何数据包",
-        "S_Closed": "已关闭数据包",
-        "recent_files": "最近打开",
-        "empty": "无",
-        "file_no_longer_exists\\n{}": "文件不存在\\n{}",
-        "save_ok": "已保存为\n{}",
-        "about_text": "MC 数据包翻译工具\n支持全版本 Java 版数据包\n作者：Ace"
-    }), ("en_US", {
-        "app_title": "MC Datapack Translator Tool",
-        "lang_name": "English",
-        "menu_file": "File",
-        "menu_open": "Open Datapack",
-        "menu_exit": "Exit",
-        "menu_edit": "Edit",
-        "menu_settings": "Settings",
-        "menu_help": "Help",
-        "menu_about": "About",
-        "col_file": "File",
-        "col_path": "Path/Line",
-        "col_source": "Original text",
-        "col_trans": "Translation",
-        "setting_show_vanilla": "Show vanilla namespace (minecraft:)",
-        "setting_lang": "Language",
-        "btn_load": "Load Datapack",
-        "btn_save": "Save Translation",
-        "btn_theme": "Toggle Theme",
-        "json_field": "JSON Fields",
-        "mcfunction_command": "MCFunction Commands",
-        "status_ready": "Drag datapack into window to start",
-        "status_parsing": "Parsing…",
-        "status_done": "Done, {} entries found",
-        "tip": "Tip",
-        "close_current": "Close File",
-        "not_opened": "No datapack opened",
-        "S_Closed": "Datapack closed",
-        "recent_files": "Recent Files",
-        "empty": "Empty",
-        "file_no_longer_exists\n{}": "File no longer exists:\n{}",
-        "save_ok": "Saved to\n{}",
-        "about_text": "MC Datapack Translator Tool\nSupports all Java Edition datapacks\nAuthor: Ace"
-    })]:
-        f = LANG_PATH / f"{lang}.json"
-        if not f.exists():
-            f.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-
     app = QApplication(sys.argv)
-    setTheme(Theme.DARK)
-    setThemeColor("#0078d4")
     w = MainWindow()
     w.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    if os.environ.get("MCDT_STARTUP_BENCH"):
+        QTimer.singleShot(0, app.quit)   # bench.py --startup：窗口显示、事件循环转起来后立即退出
+    sys.exit(app.exec())
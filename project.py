@@ -0,0 +1,174 @@
+"""项目文件：保存进行中的翻译，重新打开时不必再解析数据包（不依赖 Qt）
+
+文件由 8 字节魔数和一串记录组成，每条记录为 标记(1 字节) + 长度 + CRC32 + zlib 压缩的正文：
+  P  数据包标识：路径、大小、各文本成员的 (CRC, 大小)、解析时的命名空间过滤
+  E  完整条目表：EntryStore 的字符串表与数组列
+  T  译文变化：只含改动过的行号与译文（None 表示清空），按顺序叠加
+整体保存写 P、E 和一条包含全部译文的 T；自动保存只在末尾追加 T，从不重写整个文件。
+正文为 JSON 加上原始数组字节，不用 pickle，打开别人发来的项目文件也不会执行代码
+"""
+import json, os, pathlib, struct, sys, zlib
+from array import array
+from typing import Dict, List, Tuple
+
+from datapack import EntryStore, open_source, is_text_member
+
+MAGIC = b"MCDTPRJ1"
+RECORD = struct.Struct("<cII")   # 标记, 正文长度, 正文 CRC32
+EXTENSION = ".mcdtproj"
+
+def pack_stamps(zpath: str) -> Dict[str, Tuple[int, int]]:
+    """数据包中各文本成员的 (CRC, 大小)；zip 只读中央目录，目录来源用修改时间代替 CRC"""
+    with open_source(zpath) as src:
+        return {i.filename: (i.CRC, i.file_size) for i in src.infolist() if is_text_member(i.filename)}
+
+def _pack(meta: dict, arrays: Dict[str, array] = None) -> bytes:
+    """正文：JSON 长度 + JSON + 各数组的小端字节，数组的类型与长度记在 JSON 里"""
+    arrays = arrays or {}
+    meta = dict(meta, arrays=[[name, a.typecode, len(a)] for name, a in arrays.items()])
+    head = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    parts = [struct.pack("<I", len(head)), head]
+    for a in arrays.values():
+        if sys.byteorder == "big":
+            a = array(a.typecode, a)
+            a.byteswap()
+        parts.append(a.tobytes())
+    return zlib.compress(b"".join(parts), 1)
+
+def _unpack(body: bytes) -> Tuple[dict, Dict[str, array]]:
+    data = zlib.decompress(body)
+    n, = struct.unpack_from("<I", data)
+    pos = 4 + n
+    meta = json.loads(data[4:pos].decode("utf-8"))
+    arrays = {}
+    for name, typecode, count in meta.pop("arrays"):
+        a = array(typecode)
+        size = a.itemsize * count
+        a.frombytes(data[pos:pos + size])
+        if sys.byteorder == "big":
+            a.byteswap()
+        arrays[name] = a
+        pos += size
+    return meta, arrays
+
+def _record(tag: bytes, body: bytes) -> bytes:
+    return RECORD.pack(tag, len(body), zlib.crc32(body)) + body
+
+def _delta(rows: List[int], texts: List[str]) -> bytes:
+    return _record(b"T", _pack({"texts": texts}, {"rows": array("I", rows)}))
+
+
+class ProjectFile:
+    """一个项目文件对应一个数据包
+
+    store 是最近一次写入的条目表；界面换了 store（重新解析）时 sync() 整体重写，否则只追加译文变化
+    """
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.meta: dict = {}
+        self.store: EntryStore = None
+        self.saved: Dict[int, str] = {}   # 文件中已记录的译文
+        self.end = 0   # 最后一条完整记录的结束位置，追加前截掉其后的残缺内容
+
+    @property
+    def pack(self) -> str:
+        return self.meta.get("pack", "")
+
+    @property
+    def filter(self) -> list:
+        return self.meta.get("filter")
+
+    def matches(self) -> bool:
+        """数据包仍在且各文本成员的 CRC 与大小和保存时一致"""
+        try:
+            stamps = pack_stamps(self.pack)
+        except Exception:
+            return False
+        return stamps == {k: tuple(v) for k, v in self.meta.get("members", {}).items()}
+
+    def save(self, zpath: str, store: EntryStore, filter_spec=None):
+        """整体写出（先写临时文件再替换）"""
+        self.meta = {"version": 1, "pack": os.path.abspath(zpath),
+                     "size": os.path.getsize(zpath) if os.path.isfile(zpath) else None,
+                     "members": pack_stamps(zpath), "filter": filter_spec}
+        tables = {name: getattr(store, name) for name in EntryStore.TABLES}
+        columns = {name: getattr(store, name) for name in EntryStore.COLUMNS}
+        translations = dict(store.translations)
+        rows = sorted(translations)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(_record(b"P", _pack(self.meta)))
+            f.write(_record(b"E", _pack(tables, columns)))
+            f.write(_delta(rows, [translations[r] for r in rows]))
+            end = f.tell()
+        os.replace(tmp, self.path)
+        self.store = store
+        self.saved = translations
+        self.end = end
+
+    def append(self, store: EntryStore) -> int:
+        """把与上次写入相比改动过的译文追加到末尾，返回追加的行数"""
+        saved, current = self.saved, store.translations
+        changed = [r for r, t in current.items() if saved.get(r) != t]
+        changed += [r for r in saved if r not in current]
+        if not changed:
+            return 0
+        changed.sort()
+        with open(self.path, "r+b") as f:
+            f.truncate(self.end)
+            f.seek(self.end)
+            f.write(_delta(changed, [current.get(r) for r in changed]))
+            self.end = f.tell()
+        for r in changed:
+            t = current.get(r)
+            if t is None:
+                saved.pop(r, None)
+            else:
+                saved[r] = t
+        return len(changed)
+
+    def sync(self, zpath: str, store: EntryStore, filter_spec=None) -> int:
+        """自动保存：条目表、数据包或过滤设置变了才整体重写，否则只追加变化；返回写入的译文行数"""
+        if (store is not self.store or os.path.abspath(zpath) != self.pack or filter_spec != self.filter
+                or not self.path.exists()):
+            self.save(zpath, store, filter_spec)
+            return len(store.translations)
+        return self.append(store)
+
+    @classmethod
+    def load(cls, path) -> "ProjectFile":
+        """读出数据包标识和条目表并依次叠加译文变化；末尾残缺或校验失败的记录（写到一半时中断）被忽略"""
+        proj = cls(path)
+        with open(proj.path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"not a project file: {path}")
+        pos = len(MAGIC)
+        store = None
+        translations: Dict[int, str] = {}
+        while pos + RECORD.size <= len(data):
+            tag, length, crc = RECORD.unpack_from(data, pos)
+            body = data[pos + RECORD.size:pos + RECORD.size + length]
+            if len(body) != length or zlib.crc32(body) != crc:
+                break
+            meta, arrays = _unpack(body)
+            if tag == b"P":
+                proj.meta = meta
+            elif tag == b"E":
+                store = EntryStore.from_columns(meta, arrays)
+            elif tag == b"T":
+                for r, t in zip(arrays["rows"], meta["texts"]):
+                    if t is None:
+                        translations.pop(r, None)
+                    else:
+                        translations[r] = t
+            pos += RECORD.size + length
+        if store is None or not proj.meta:
+            raise ValueError(f"incomplete project file: {path}")
+        store.translations = translations
+        proj.store = store
+        proj.saved = dict(translations)
+        proj.end = pos
+        return proj
@@ -0,0 +1,290 @@
+"""表格筛选：原文 / 译文的三元组倒排索引与文件名 / 路径的前缀查找（不依赖 Qt）
+
+查询以空格分隔，file:前缀 与 path:前缀 按文件名 / 路径开头匹配，其余词连起来作为子串，
+不区分大小写地在原文或译文中查找；另可只看未翻译的条目、只看某个命名空间。
+索引建好后每个条件都先算成按行号的 0/1 字节掩码，掩码之间用大整数按位与合并，
+逐行的 Python 循环只发生在命中（或未命中，取较少的一边）的行上
+"""
+import bisect, operator
+from array import array
+from collections import Counter
+from itertools import compress, repeat
+from typing import Dict, List, Set, Tuple
+
+from datapack import EntryStore, member_namespace
+
+GRAM = 3
+PREFIX_END = "\U0010ffff"   # 前缀查找的上界：prefix + PREFIX_END 排在所有以 prefix 开头的字符串之后
+INVERT = bytes.maketrans(b"\0\1", b"\1\0")
+
+def grams(text: str) -> set:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+def index_grams(text: str) -> set:
+    """译文建索引用：长度 1 到 GRAM 的全部子串，查询不超过 GRAM 个字符时倒排表本身就是结果"""
+    return {text[i:i + n] for n in range(1, GRAM + 1) for i in range(len(text) - n + 1)}
+
+def mask_and(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "little") & int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+def group_rows(col: array, groups: int) -> Tuple[array, array]:
+    """按 col 中的编号把行号分组（计数排序）：第 g 组的行为 order[offsets[g]:offsets[g + 1]]，组内行号递增"""
+    offsets = array("I", bytes(4 * (groups + 1)))
+    for g in col:
+        offsets[g + 1] += 1
+    for g in range(groups):
+        offsets[g + 1] += offsets[g]
+    fill = array("I", offsets)
+    order = array("I", bytes(4 * len(col)))
+    for row, g in enumerate(col):
+        order[fill[g]] = row
+        fill[g] += 1
+    return order, offsets
+
+
+class Query:
+    """一次筛选的条件；namespace 为 None 表示不限命名空间"""
+    __slots__ = ("text", "file", "path", "untranslated", "namespace")
+    def __init__(self, spec: str = "", untranslated: bool = False, namespace: str = None):
+        words = []
+        self.file = self.path = None
+        for w in spec.split():
+            if w.startswith("file:"):
+                self.file = w[5:]
+            elif w.startswith("path:"):
+                self.path = w[5:]
+            else:
+                words.append(w)
+        self.text = " ".join(words).lower()
+        self.untranslated = untranslated
+        self.namespace = namespace
+    def __bool__(self):
+        return bool(self.text or self.file or self.path or self.untranslated or self.namespace is not None)
+
+
+class SearchIndex:
+    """建在一个 EntryStore 上的筛选索引
+
+    原文去重、转小写后建三元组倒排表（表中为原文编号，更短的查询第一次出现时扫描一遍再补进表里），再按原文编号、路径编号把行号分组；
+    译文按行号建倒排表（集合）并维护一份“已翻译”掩码，改译文后 update(row) 只改动这一行。
+    build() 的耗时与条目数成正比，界面在后台线程调用，finish() 之前 filter() 逐行扫描，结果相同
+    """
+    def __init__(self, store: EntryStore):
+        self.store = store
+        self.ready = False
+        self.dirty: Set[int] = set()   # build() 期间改过译文的行，finish() 时补上
+        self.low: List[str] = []   # 去重后转小写的原文
+        self.text_id = array("I")   # 行号 -> 原文编号
+        self.text_grams: Dict[str, array] = {}
+        self.text_rows: Tuple[array, array] = (array("I"), array("I"))   # 原文编号 -> 行号
+        self.path_rows: Tuple[array, array] = (array("I"), array("I"))   # 路径编号 -> 行号
+        self.file_spans: Dict[int, List[Tuple[int, int]]] = {}   # 文件编号 -> 连续的行区间
+        self.trans_low: Dict[int, str] = {}
+        self.trans_grams: Dict[str, Set[int]] = {}
+        self.translated = bytearray()
+        self.file_keys: List[str] = []   # 排序后的文件名与对应 id，前缀查找用
+        self.file_order: List[int] = []
+        self.path_keys: List[str] = []
+        self.path_order: List[int] = []
+        self._base = (None, 0, b"")   # 上次 filter() 的 rows 及其掩码
+
+    def build(self):
+        store = self.store
+        n = len(store)
+        ids: Dict[str, int] = {}
+        low, text_id = [], array("I")
+        for t in store.texts:
+            i = ids.get(t)
+            if i is None:
+                i = ids[t] = len(low)
+                low.append(t.lower())
+            text_id.append(i)
+        text_grams: Dict[str, array] = {}
+        for i, t in enumerate(low):
+            for g in grams(t):
+                p = text_grams.get(g)
+                if p is None:
+                    p = text_grams[g] = array("I")
+                p.append(i)
+        file_spans: Dict[int, List[Tuple[int, int]]] = {}
+        start = 0
+        file_col = store.file_col
+        while start < n:   # add() 把同一文件的行连续追加，按段扫描
+            fid = file_col[start]
+            end = start + 1
+            while end < n and file_col[end] == fid:
+                end += 1
+            file_spans.setdefault(fid, []).append((start, end))
+            start = end
+        trans_low = {r: t.lower() for r, t in list(store.translations.items())}
+        trans_grams: Dict[str, Set[int]] = {}
+        translated = bytearray(n)
+        for r, t in trans_low.items():
+            translated[r] = 1
+            for g in index_grams(t):
+                p = trans_grams.get(g)
+                if p is None:
+                    p = trans_grams[g] = set()
+                p.add(r)
+        self.file_order = sorted(range(len(store.files)), key=store.files.__getitem__)
+        self.file_keys = [store.files[i] for i in self.file_order]
+        self.path_order = sorted(range(len(store.paths)), key=store.paths.__getitem__)
+        self.path_keys = [store.paths[i] for i in self.path_order]
+        self.text_rows = group_rows(text_id, len(low))
+        self.path_rows = group_rows(store.path_col[:n], len(store.paths))
+        self.low, self.text_id, self.text_grams, self.file_spans = low, text_id, text_grams, file_spans
+        self.trans_low, self.trans_grams, self.translated = trans_low, trans_grams, translated
+
+    def finish(self):
+        """在改译文的同一线程（界面线程）调用：补上 build() 期间的改动后启用索引"""
+        self.ready = True
+        for row in self.dirty:
+            self._update(row)
+        self.dirty.clear()
+
+    def update(self, row: int):
+        """行 row 的译文改了（含清空）"""
+        if self.ready:
+            self._update(row)
+        else:
+            self.dirty.add(row)
+
+    def _update(self, row: int):
+        old = self.trans_low.pop(row, None)
+        if old is not None:
+            for g in index_grams(old):
+                p = self.trans_grams.get(g)
+                if p is not None:
+                    p.discard(row)
+                    if not p:
+                        del self.trans_grams[g]
+        new = self.store.translations.get(row)
+        self.translated[row] = bool(new)
+        if new:
+            new = self.trans_low[row] = new.lower()
+            for g in index_grams(new):
+                p = self.trans_grams.get(g)
+                if p is None:
+                    p = self.trans_grams[g] = set()
+                p.add(row)
+
+    # -------------------- 掩码 --------------------
+    def _rows_mask(self, groups: Tuple[array, array], col: array, hit: bytearray) -> bytearray:
+        """hit 为按组编号的掩码，展开成按行号的掩码（col 为行号 -> 组编号）
+
+        只涉及少数行时按组展开命中与未命中中较少的一边，否则逐行查表更快
+        """
+        order, offsets = groups
+        hits = hit.count(1)
+        value = hits * 2 <= len(hit)
+        if min(hits, len(hit) - hits) * len(col) > len(hit) * len(col) // 4:
+            return bytearray(map(hit.__getitem__, col))
+        mask = bytearray(len(self.store)) if value else bytearray(b"\1") * len(self.store)
+        for g in compress(range(len(hit)), hit if value else hit.translate(INVERT)):
+            for row in order[offsets[g]:offsets[g + 1]]:
+                mask[row] = value
+        return mask
+
+    def _text_mask(self, q: str) -> bytes:
+        """原文或译文含 q 的行；q 比 GRAM 长时只核对 q 中最稀有的三元组对应的那些"""
+        low = self.low
+        hit = bytearray(len(low))
+        if len(q) < GRAM:
+            found = self.text_grams.get(q)
+            if found is None:
+                found = self.text_grams[q] = array("I", compress(range(len(low)),
+                                                                 map(operator.contains, low, repeat(q))))
+        elif len(q) == GRAM:
+            found = self.text_grams.get(q, ())
+        else:
+            cand = min((self.text_grams.get(g, ()) for g in grams(q)), key=len)
+            found = compress(cand, map(operator.contains, map(low.__getitem__, cand), repeat(q)))
+        for i in found:
+            hit[i] = 1
+        mask = self._rows_mask(self.text_rows, self.text_id, hit)
+        trans_low = self.trans_low
+        if len(q) <= GRAM:
+            found = self.trans_grams.get(q, ())
+        else:
+            cand = min((self.trans_grams.get(g, ()) for g in grams(q)), key=len)
+            found = (r for r in cand if q in trans_low[r])
+        for r in found:
+            mask[r] = 1
+        return mask
+
+    def _file_mask(self, fids) -> bytearray:
+        mask = bytearray(len(self.store))
+        for fid in fids:
+            for start, end in self.file_spans.get(fid, ()):
+                mask[start:end] = b"\1" * (end - start)
+        return mask
+
+    @staticmethod
+    def _prefix(keys: List[str], order: List[int], prefix: str) -> List[int]:
+        return order[bisect.bisect_left(keys, prefix):bisect.bisect_left(keys, prefix + PREFIX_END)]
+
+    def mask(self, query: Query) -> bytes:
+        """满足 query 的行的掩码（不含外部传入的 rows 限制）"""
+        store = self.store
+        masks = []
+        if query.namespace is not None:
+            masks.append(self._file_mask(i for i, f in enumerate(store.files)
+                                         if member_namespace(f) == query.namespace))
+        if query.file:
+            masks.append(self._file_mask(self._prefix(self.file_keys, self.file_order, query.file)))
+        if query.path:
+            hit = bytearray(len(store.paths))
+            for pid in self._prefix(self.path_keys, self.path_order, query.path):
+                hit[pid] = 1
+            masks.append(self._rows_mask(self.path_rows, store.path_col, hit))
+        if query.untranslated:
+            masks.append(bytes(self.translated).translate(INVERT))
+        if query.text:
+            masks.append(self._text_mask(query.text))
+        result = masks[0]
+        for m in masks[1:]:
+            result = mask_and(result, m)
+        return result
+
+    # -------------------- 查询 --------------------
+    def _scan(self, rows, query: Query) -> array:
+        """索引建好之前（以及解析中新增的行）逐行判断"""
+        store = self.store
+        texts, translations, files, paths = store.texts, store.translations, store.files, store.paths
+        q = query.text
+        def ok(r):
+            if query.namespace is not None and member_namespace(files[store.file_col[r]]) != query.namespace:
+                return False
+            if query.file and not files[store.file_col[r]].startswith(query.file):
+                return False
+            if query.path and not paths[store.path_col[r]].startswith(query.path):
+                return False
+            if query.untranslated and r in translations:
+                return False
+            return not q or q in texts[r].lower() or q in translations.get(r, "").lower()
+        return array("I", filter(ok, rows))
+
+    def filter(self, rows: array, query: Query) -> array:
+        """rows（递增的行号）中满足 query 的行；同一个 rows 反复查询时它的掩码只算一次"""
+        if not query:
+            return rows
+        if not self.ready:
+            return self._scan(rows, query)
+        base, size, base_mask = self._base
+        if base is not rows or size != len(rows):
+            base_mask = bytearray(len(self.store))
+            for r in rows:
+                base_mask[r] = 1
+            self._base = (rows, len(rows), base_mask)
+        mask = mask_and(base_mask, self.mask(query))
+        return array("I", compress(range(len(mask)), mask))
+
+    def namespaces(self, rows) -> List[Tuple[str, int]]:
+        """rows 中各命名空间的条目数，按命名空间排序；不在 data/ 下的文件不计"""
+        per_file = Counter(map(self.store.file_col.__getitem__, rows))
+        counts: Dict[str, int] = {}
+        for fid, n in per_file.items():
+            ns = member_namespace(self.store.files[fid])
+            if ns is not None:
+                counts[ns] = counts.get(ns, 0) + n
+        return sorted(counts.items())
@@ -0,0 +1,179 @@
+"""翻译记忆：按规范化原文建哈希索引，跨数据包、跨会话复用译文（不依赖 Qt）
+
+记忆以 JSON Lines 追加写入，每行 {"s": 原文, "t": 译文}，加载时后写的覆盖先写的；
+近似匹配使用原文 n-gram 倒排索引，查询时只看与输入共享 n-gram 的条目
+"""
+import json, os, pathlib, re, heapq, math, threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from datapack import EntryStore
+
+
+def normalize(text: str) -> str:
+    """合并空白并去掉首尾空白，作为精确匹配的键"""
+    return " ".join(text.split())
+
+
+RE_FORMAT_CODE = re.compile("§.")
+
+def ngrams(text: str, n: int = 3) -> set:
+    """去掉 § 格式码、转小写后的字符 n-gram 集合，两端补空格让短词也有 n-gram"""
+    t = f" {RE_FORMAT_CODE.sub('', normalize(text)).lower()} "
+    return {t[i:i + n] for i in range(max(1, len(t) - n + 1))}
+
+
+class NgramIndex:
+    """原文的 n-gram 倒排索引，按 Dice 系数给出最相近的 top-k
+
+    查询用前缀过滤：相似度不低于 min_score 的条目至少共享 c 个 n-gram，
+    因此必然出现在最稀有的 qn - c + 1 个 n-gram 的倒排表里，只需合并这几张短表，
+    再对计数最高的一小批候选精确计算相似度
+    """
+    CANDIDATES_PER_RESULT = 20
+
+    def __init__(self, n: int = 3):
+        self.n = n
+        self.sources: List[str] = []
+        self.postings: Dict[str, array] = {}
+
+    def __len__(self):
+        return len(self.sources)
+
+    def add(self, source: str):
+        sid = len(self.sources)
+        self.sources.append(source)
+        postings = self.postings
+        for g in ngrams(source, self.n):
+            p = postings.get(g)
+            if p is None:
+                p = postings[g] = array("I")
+            p.append(sid)
+
+    def query(self, text: str, k: int = 5, min_score: float = 0.5) -> List[Tuple[float, str]]:
+        grams = ngrams(text, self.n)
+        qn = len(grams)
+        lists = sorted((self.postings.get(g, ()) for g in grams), key=len)
+        shared = math.ceil(min_score * qn / (2 - min_score))
+        counts = Counter()
+        for p in lists[:max(1, qn - shared + 1)]:
+            counts.update(p)
+        scored = []
+        for sid, _ in counts.most_common(k * self.CANDIDATES_PER_RESULT):
+            other = ngrams(self.sources[sid], self.n)
+            score = 2 * len(grams & other) / (qn + len(other))
+            if score >= min_score:
+                scored.append((score, sid))
+        return [(score, self.sources[sid]) for score, sid in heapq.nlargest(k, scored)]
+
+
+class TranslationMemory:
+    COMPACT_RATIO = 2   # 文件行数超过条目数的这个倍数时整体重写一次
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.pairs: Dict[str, str] = {}
+        self.lines = 0
+        self._fuzzy: NgramIndex = None
+        self._pending: List[str] = None   # 后台建近似索引期间 update() 新加的原文，建好时补进去
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self.pairs.clear()
+        self.lines = 0
+        self._fuzzy = None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self.pairs[rec["s"]] = rec["t"]
+                        self.lines += 1
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def get(self, text: str) -> str:
+        return self.pairs.get(normalize(text), "")
+
+    @property
+    def fuzzy_ready(self) -> bool:
+        return self._fuzzy is not None
+
+    def fuzzy(self) -> NgramIndex:
+        """近似匹配索引，第一次用到时才建立（可在后台线程调用），建立期间与之后 update 的原文都会补进索引"""
+        if self._fuzzy is None:
+            with self._lock:
+                self._pending = []
+            sources = list(self.pairs)
+            index = NgramIndex()
+            for source in sources:
+                index.add(source)
+            with self._lock:
+                known = set(sources)
+                for source in self._pending:
+                    if source not in known:
+                        known.add(source)
+                        index.add(source)
+                self._pending = None
+                self._fuzzy = index
+        return self._fuzzy
+
+    def suggest(self, text: str, k: int = 5, min_score: float = 0.5) -> List[Tuple[float, str, str]]:
+        """返回 [(相似度, 记忆中的原文, 译文)]，按相似度从高到低"""
+        return [(score, source, self.pairs[source])
+                for score, source in self.fuzzy().query(text, k, min_score)]
+
+    def prefill(self, store: EntryStore) -> int:
+        """给尚未翻译的条目填入记忆中的译文，返回填充条数"""
+        pairs, translations = self.pairs, store.translations
+        filled = 0
+        for row, text in enumerate(store.texts):
+            if row in translations:
+                continue
+            t = pairs.get(normalize(text))
+            if t:
+                translations[row] = t
+                filled += 1
+        return filled
+
+    def update(self, pairs: Iterable[Tuple[str, str]]) -> int:
+        """记录新的或改动过的译文，只追加变化的部分，返回追加条数"""
+        new = []
+        for source, translated in pairs:
+            key = normalize(source)
+            if key and translated and self.pairs.get(key) != translated:
+                if key not in self.pairs:
+                    with self._lock:
+                        if self._fuzzy is not None:
+                            self._fuzzy.add(key)
+                        elif self._pending is not None:
+                            self._pending.append(key)
+                self.pairs[key] = translated
+                new.append((key, translated))
+        if not new:
+            return 0
+        if self.lines + len(new) > self.COMPACT_RATIO * len(self.pairs) + 1000:
+            self.compact()
+            return len(new)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for s, t in new:
+                f.write(json.dumps({"s": s, "t": t}, ensure_ascii=False) + "\n")
+        self.lines += len(new)
+        return len(new)
+
+    def compact(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for s, t in self.pairs.items():
+                f.write(json.dumps({"s": s, "t": t}, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        self.lines = len(self.pairs)
@@ -1,5 +1,5 @@
 @echo off
-pyinstaller main.py  --noconsole --icon=icon.ico --add-data "langs;langs"
+pyinstaller main.py  --noconsole --noupx --icon=icon.ico --add-data "langs;langs"
 echo =====  =====
 dir dist\main.exe
 pause
\ No newline at end of file